@@ -0,0 +1,201 @@
+import os
+import sqlite3
+from collections import deque
+from hashlib import sha1
+from concurrent.futures import ThreadPoolExecutor
+
+
+def import_zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise Exception("Archive needs zstandard module, install it with \"pip install zstandard\"")
+
+    return zstandard
+
+
+class VersionArchive:
+    def __init__(self, path: str, level: int = 10, max_workers: int or None = None) -> None:
+        self.path = path
+        self.packs_path = os.path.join(path, "packs")
+        self.level = level
+        self.max_workers = max_workers
+
+        os.makedirs(self.packs_path, exist_ok=True)
+
+        # Every object is a separate zstd frame, so any file can be read without touching the rest of pack
+        self.connection = sqlite3.connect(os.path.join(path, "index.db"), check_same_thread=False)
+        self.connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS objects (
+                sha TEXT PRIMARY KEY,
+                pack TEXT NOT NULL,
+                offset INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                raw_size INTEGER NOT NULL
+            ) WITHOUT ROWID;
+            """
+        )
+        self.connection.commit()
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def contains(self, hash: str) -> bool:
+        return self.connection.execute("SELECT 1 FROM objects WHERE sha = ?", (hash,)).fetchone() is not None
+
+    def make_pack_name(self, version_hash: str) -> str:
+        name = f"{version_hash}.pack"
+
+        index = 1
+        while os.path.exists(os.path.join(self.packs_path, name)):
+            name = f"{version_hash}.{index}.pack"
+            index += 1
+
+        return name
+
+    def compress_file(self, hash: str, filepath: str) -> tuple[bytes, int] or None:
+        zstandard = import_zstandard()
+
+        try:
+            with open(filepath, "rb") as file:
+                data = file.read()
+        except FileNotFoundError:
+            return None
+
+        # Objects are addressed by content hash, so file that does not match its hash must not be stored
+        if sha1(data).hexdigest() != hash:
+            return None
+
+        return zstandard.ZstdCompressor(level=self.level).compress(data), len(data)
+
+    def add_files(self, version_hash: str, files: list[tuple[str, str]]) -> tuple[int, int, int]:
+        """
+        The function `add_files` compresses files that are not in archive yet into a new pack of version.
+        Files with the same content are stored only once across all versions.
+
+        :param version_hash: Hash of fingerprint that files belong to, used as pack name
+        :type version_hash: str
+        :param files: List of (content hash, path to file) pairs
+        :type files: list[tuple[str, str]]
+        :return: count of stored files, their size and size in archive
+        """
+
+        import_zstandard()
+
+        pending: dict[str, str] = {}
+        for hash, filepath in files:
+            if hash in pending or self.contains(hash): continue
+            pending[hash] = filepath
+
+        if len(pending) == 0: return (0, 0, 0)
+
+        pack_name = self.make_pack_name(version_hash)
+        pack_path = os.path.join(self.packs_path, pack_name)
+        temp_pack_path = f"{pack_path}.part"
+
+        rows: list[tuple[str, str, int, int, int]] = []
+        offset = 0
+        raw_size = 0
+
+        # Only a window of files is compressed ahead of writer, so compressed data of whole version is never held in memory
+        window_size = (self.max_workers or os.cpu_count() or 1) * 2
+        items = iter(pending.items())
+        futures = deque()
+
+        with ThreadPoolExecutor(self.max_workers) as executor, open(temp_pack_path, "wb") as pack:
+            for hash, filepath in items:
+                futures.append((hash, executor.submit(self.compress_file, hash, filepath)))
+                if len(futures) == window_size: break
+
+            while len(futures) > 0:
+                hash, future = futures.popleft()
+                result = future.result()
+
+                next_item = next(items, None)
+                if next_item is not None:
+                    futures.append((next_item[0], executor.submit(self.compress_file, *next_item)))
+
+                if result is None:
+                    print(f"[Archive] Skipped \"{os.path.normpath(pending[hash])}\", file is missing or its content does not match hash")
+                    continue
+
+                data, size = result
+                pack.write(data)
+                rows.append((hash, pack_name, offset, len(data), size))
+                offset += len(data)
+                raw_size += size
+
+        if len(rows) == 0:
+            os.remove(temp_pack_path)
+            return (0, 0, 0)
+
+        os.replace(temp_pack_path, pack_path)
+
+        # Index is written only after pack is complete, so interrupted archiving leaves no broken records
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO objects (sha, pack, offset, size, raw_size) VALUES (?, ?, ?, ?, ?)", rows
+            )
+
+        return (len(rows), raw_size, offset)
+
+    def extract_files(self, files: list[tuple[str, str]]) -> list[tuple[str, str]]:
+        """
+        The function `extract_files` writes files from archive by their content hashes.
+        Files are read in order of their position in packs and only requested frames are decompressed.
+
+        :param files: List of (content hash, destination path) pairs
+        :type files: list[tuple[str, str]]
+        :return: list of pairs that are not present in archive
+        """
+
+        locations: list[tuple[str, int, int, int, str]] = []
+        missing_files: list[tuple[str, str]] = []
+
+        for hash, destination in files:
+            row = self.connection.execute(
+                "SELECT pack, offset, size, raw_size FROM objects WHERE sha = ?", (hash,)
+            ).fetchone()
+
+            if row is None:
+                missing_files.append((hash, destination))
+            else:
+                locations.append((*row, destination))
+
+        if len(locations) == 0: return missing_files
+
+        decompressor = import_zstandard().ZstdDecompressor()
+        pack_name: str or None = None
+        pack = None
+
+        try:
+            for name, offset, size, raw_size, destination in sorted(locations):
+                if name != pack_name:
+                    if pack is not None: pack.close()
+                    pack_name = name
+                    pack = open(os.path.join(self.packs_path, name), "rb")
+
+                pack.seek(offset)
+                data = decompressor.decompress(pack.read(size), max_output_size=raw_size)
+
+                directory = os.path.dirname(destination)
+                if (directory):
+                    os.makedirs(directory, exist_ok=True)
+
+                temp_destination = f"{destination}.part"
+                with open(temp_destination, "wb") as file:
+                    file.write(data)
+                os.replace(temp_destination, destination)
+        finally:
+            if pack is not None: pack.close()
+
+        return missing_files
+
+    def extract(self, hash: str, destination: str) -> bool:
+        """
+        The function `extract` writes a single file from archive by its content hash.
+        :return: True if file is present in archive
+        """
+
+        return len(self.extract_files([(hash, destination)])) == 0
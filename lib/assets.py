@@ -0,0 +1,274 @@
+import os
+import json
+import tempfile
+from collections import OrderedDict
+from concurrent.futures import Future
+from hashlib import sha1
+from threading import Lock
+from .catalog import VersionCatalog
+from .downloader import DownloaderWorker
+
+
+class AssetCache:
+    def __init__(self, path: str, max_disk_size: int = 1024 ** 3, max_memory_size: int = 64 * 1024 ** 2) -> None:
+        self.path = path
+        self.max_disk_size = max_disk_size
+        self.max_memory_size = max_memory_size
+
+        self.lock = Lock()
+        self.memory: OrderedDict[str, bytes] = OrderedDict()
+        self.memory_size = 0
+        self.disk: OrderedDict[str, int] = OrderedDict()
+        self.disk_size = 0
+
+        os.makedirs(path, exist_ok=True)
+
+        # Restoring disk cache state, least recently used files go first
+        entries: list[tuple[float, str, int]] = []
+        for folder in os.scandir(path):
+            if not folder.is_dir(): continue
+
+            for entry in os.scandir(folder.path):
+                if not entry.is_file() or entry.name.endswith(".tmp"): continue
+
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.name, stat.st_size))
+
+        for _, key, size in sorted(entries):
+            self.disk[key] = size
+            self.disk_size += size
+
+    def get_filepath(self, key: str) -> str:
+        return os.path.join(self.path, key[:2], key)
+
+    def get(self, key: str) -> bytes or None:
+        """
+        The function `get` returns cached content by its hash from memory or from disk.
+
+        :param key: Hash of file content
+        :type key: str
+        :return: file content or None if it is not cached
+        """
+
+        with self.lock:
+            data = self.memory.get(key)
+            if data is not None:
+                self.memory.move_to_end(key)
+                return data
+
+            if key not in self.disk:
+                return None
+
+            self.disk.move_to_end(key)
+
+        filepath = self.get_filepath(key)
+        try:
+            with open(filepath, "rb") as file:
+                data = file.read()
+            os.utime(filepath)
+        except FileNotFoundError:
+            with self.lock:
+                self.disk_size -= self.disk.pop(key, 0)
+            return None
+
+        self.put_memory(key, data)
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """
+        The function `put` adds content to memory and disk caches, evicting least recently used entries
+        if caches are out of space.
+
+        :param key: Hash of file content
+        :type key: str
+        :param data: File content
+        :type data: bytes
+        """
+
+        self.put_memory(key, data)
+        if len(data) > self.max_disk_size: return
+
+        filepath = self.get_filepath(key)
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+
+        # Every writer has its own temp file, so threads that store the same key do not collide
+        descriptor, temp_filepath = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(filepath))
+        with os.fdopen(descriptor, "wb") as file:
+            file.write(data)
+        os.replace(temp_filepath, filepath)
+
+        evicted: list[str] = []
+        with self.lock:
+            self.disk_size += len(data) - self.disk.pop(key, 0)
+            self.disk[key] = len(data)
+
+            while self.disk_size > self.max_disk_size:
+                evicted_key, evicted_size = self.disk.popitem(last=False)
+                self.disk_size -= evicted_size
+                evicted.append(evicted_key)
+
+        for evicted_key in evicted:
+            try:
+                os.remove(self.get_filepath(evicted_key))
+            except FileNotFoundError:
+                pass
+
+    def put_memory(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_memory_size: return
+
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                return
+
+            self.memory[key] = data
+            self.memory_size += len(data)
+
+            while self.memory_size > self.max_memory_size:
+                _, evicted_data = self.memory.popitem(last=False)
+                self.memory_size -= len(evicted_data)
+
+
+class AssetStore:
+    def __init__(
+        self,
+        catalog_path: str = "catalog.db",
+        cache_path: str = "cache",
+        max_disk_size: int = 1024 ** 3,
+        max_memory_size: int = 64 * 1024 ** 2,
+    ) -> None:
+        self.catalog = VersionCatalog(catalog_path)
+        self.cache = AssetCache(cache_path, max_disk_size, max_memory_size)
+        self.catalog_lock = Lock()
+
+        # Downloads in progress by content hash, concurrent misses of the same content wait for one download
+        self.pending: dict[str, Future] = {}
+        self.pending_lock = Lock()
+
+    def resolve(self, server: str, path: str, version_or_hash: str or None, asset_servers: list[str]) -> tuple[str, str]:
+        """
+        The function `resolve` finds version hash and file content hash of asset using cached fingerprints.
+        If version hash is unknown, its fingerprint is downloaded and added to catalog.
+
+        :return: a tuple of version hash and file content hash
+        """
+
+        with self.catalog_lock:
+            version = self.catalog.resolve_version(server, version_or_hash)
+
+        if version is None:
+            if version_or_hash is None:
+                raise Exception(f"There are no known versions of {server}")
+
+            if len(asset_servers) == 0:
+                raise Exception(f"There are no known asset servers of {server}")
+
+            fingerprint = DownloaderWorker.download_file(asset_servers, version_or_hash, "fingerprint.json")
+            if isinstance(fingerprint, int):
+                raise Exception(f"Failed to get fingerprint.json by hash {version_or_hash}. Request failed with code {fingerprint}")
+
+            with self.catalog_lock:
+                self.catalog.add_fingerprint(server, json.loads(fingerprint))
+                version = self.catalog.resolve_version(server, version_or_hash)
+
+        with self.catalog_lock:
+            file_hash = self.catalog.get_file_hash(version[0], path)
+
+        if file_hash is None:
+            raise FileNotFoundError(f"{path} is not found in {server} version {version[2]}")
+
+        return version[1], file_hash
+
+    def open_asset(
+        self,
+        server: str,
+        path: str,
+        version_or_hash: str or None = None,
+        asset_servers: list[str] or None = None,
+    ) -> bytes:
+        """
+        The function `open_asset` returns content of a single asset file. Repeated requests of the same
+        content are served from cache without network access.
+
+        :param server: Short name of the server from config
+        :type server: str
+        :param path: Asset path with "/" as separator, for example "csv_logic/characters.csv"
+        :type path: str
+        :param version_or_hash: Fingerprint hash or version number. If None then the latest known version is used
+        :type version_or_hash: str or None
+        :param asset_servers: Asset servers to download from. Latest known asset servers of server are used by default
+        :type asset_servers: list[str] or None
+        :return: file content
+        """
+
+        if asset_servers is None:
+            with self.catalog_lock:
+                asset_servers = self.catalog.get_asset_servers(server)
+
+        version_hash, file_hash = self.resolve(server, path, version_or_hash, asset_servers)
+
+        data = self.cache.get(file_hash)
+        if data is not None:
+            return data
+
+        if len(asset_servers) == 0:
+            raise Exception(f"There are no known asset servers of {server}")
+
+        with self.pending_lock:
+            pending = self.pending.get(file_hash)
+            is_owner = pending is None
+            if is_owner:
+                pending = Future()
+                self.pending[file_hash] = pending
+
+        if not is_owner:
+            return pending.result()
+
+        try:
+            data = self.download(asset_servers, version_hash, path, file_hash)
+            pending.set_result(data)
+            return data
+        except Exception as exception:
+            pending.set_exception(exception)
+            raise
+        finally:
+            with self.pending_lock:
+                self.pending.pop(file_hash, None)
+
+    def download(self, asset_servers: list[str], version_hash: str, path: str, file_hash: str) -> bytes:
+        """
+        The function `download` downloads asset, verifies it by hash and stores it in cache.
+        """
+
+        # Content may be cached by previous download that finished right before this one started
+        data = self.cache.get(file_hash)
+        if data is not None:
+            return data
+
+        data = DownloaderWorker.download_file(asset_servers, version_hash, path)
+        if isinstance(data, int):
+            raise Exception(f"Failed to download \"{path}\" with code {data}")
+
+        if sha1(data).hexdigest() != file_hash:
+            raise Exception(f"Downloaded \"{path}\" does not match its hash from fingerprint")
+
+        self.cache.put(file_hash, data)
+        return data
+
+
+default_store: AssetStore or None = None
+default_store_lock = Lock()
+
+
+def open_asset(server: str, path: str, version_or_hash: str or None = None, asset_servers: list[str] or None = None) -> bytes:
+    """
+    The function `open_asset` returns content of a single asset file using default `AssetStore`
+    with "catalog.db" version catalog and "cache/" folder for cached files.
+    """
+
+    global default_store
+    with default_store_lock:
+        if default_store is None:
+            default_store = AssetStore()
+
+    return default_store.open_asset(server, path, version_or_hash, asset_servers)
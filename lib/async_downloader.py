@@ -0,0 +1,167 @@
+import os
+import asyncio
+import posixpath
+from .downloader import CHUNK_SIZE, Downloader, DownloaderWorker
+from .item_chain import ItemChain
+from .profiler import profiler
+
+
+class AsyncByteBudget:
+    def __init__(self, capacity: int or None = None) -> None:
+        # Same as ByteBudget from budget module, but waits in event loop instead of blocking thread
+        self.capacity = capacity or None
+        self.used = 0
+        self.condition = asyncio.Condition()
+
+    async def acquire(self, size: int) -> int:
+        if self.capacity is None: return 0
+
+        size = min(size, self.capacity)
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.used + size <= self.capacity)
+            self.used += size
+
+        return size
+
+    async def release(self, size: int) -> None:
+        if self.capacity is None or size == 0: return
+
+        async with self.condition:
+            self.used -= size
+            self.condition.notify_all()
+
+
+class AsyncDownloader(Downloader):
+    def __init__(self, *args, max_requests: int = 256, max_connections: int = 64, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+
+        # Requests above max_connections wait in connection pool, requests above max_requests are not started
+        self.max_requests = max_requests
+        self.max_connections = max_connections
+        self.jobs: list[tuple[str, ItemChain]] = []
+
+    def add_worker(self, basepath: str, chain: ItemChain) -> bool:
+        """
+        The function `add_worker` adds chunk of files to the job list, which is downloaded by
+        `download_folder` after all folders are processed.
+        """
+
+        self.jobs.append((basepath, chain))
+        return True
+
+    def check_workers_status(self) -> bool:
+        return True
+
+    def wait_for_workers(self) -> None:
+        pass
+
+    def stop_all_workers(self):
+        pass
+
+    async def download_item(
+        self,
+        session,
+        semaphore: asyncio.Semaphore,
+        budget: AsyncByteBudget,
+        base_filepath: str,
+    ) -> None:
+        """
+        The function `download_item` downloads a single file trying all asset servers in order.
+        Body is written by chunks in thread executor, so event loop is never blocked by disk, and
+        bytes in flight are limited by budget the same way as in thread downloader.
+        """
+
+        loop = asyncio.get_running_loop()
+        filepath = os.path.join(self.output_folder, base_filepath)
+
+        async with semaphore:
+            is_downloaded = False
+            status_code = 0
+
+            for url in self.content_urls:
+                try:
+                    async with session.get(f"{url}/{self.content_hash}/{base_filepath}") as response:
+                        status_code = response.status
+                        if status_code != 200: continue
+
+                        reserved = await budget.acquire(response.content_length) if response.content_length is not None else 0
+                        file = await loop.run_in_executor(None, open, f"{filepath}.part", "wb")
+                        is_written = False
+                        try:
+                            while True:
+                                # Body is longer than budget or its length is unknown
+                                if reserved == 0:
+                                    reserved = await budget.acquire(CHUNK_SIZE)
+
+                                chunk = await response.content.read(CHUNK_SIZE)
+                                if not chunk: break
+
+                                await loop.run_in_executor(None, DownloaderWorker.write_chunk, file, chunk)
+                                released = min(reserved, len(chunk))
+                                await budget.release(released)
+                                reserved -= released
+
+                            is_written = True
+                        finally:
+                            await loop.run_in_executor(None, file.close)
+                            await budget.release(reserved)
+
+                            # Partial body must not be left on disk, it would be taken for a real file by next run
+                            if not is_written:
+                                await loop.run_in_executor(None, DownloaderWorker.remove_part, filepath)
+
+                        is_downloaded = True
+                except Exception as exception:
+                    print(f"[Async] Failed to download \"{base_filepath}\": {exception}")
+                    continue
+
+                if is_downloaded: break
+
+            if not is_downloaded:
+                print(f"[Async] Failed to download \"{base_filepath}\" with code {status_code}")
+                return
+
+            await loop.run_in_executor(
+                None, DownloaderWorker.finish_file, self.output_folder, base_filepath, self.pipelines
+            )
+
+        print(f"[Async] Downloaded {base_filepath}")
+
+    async def download_jobs(self, jobs: list[tuple[str, ItemChain]]) -> None:
+        try:
+            import aiohttp
+        except ImportError:
+            raise Exception("asyncio download backend needs aiohttp module, install it with \"pip install aiohttp\"")
+
+        semaphore = asyncio.Semaphore(self.max_requests)
+        budget = AsyncByteBudget(self.max_inflight_bytes)
+        connector = aiohttp.TCPConnector(limit=self.max_connections)
+
+        async with aiohttp.ClientSession(connector=connector) as session:
+            await asyncio.gather(*[
+                self.download_item(session, semaphore, budget, posixpath.join(basepath, item.name))
+                for basepath, chain in jobs
+                for item in chain.items
+            ])
+
+    def download_folder(self, folder: ItemChain) -> None:
+        """
+        The function `download_folder` plans download of a folder the same way as thread downloader
+        and downloads all files concurrently in event loop.
+
+        :param folder: The `folder` parameter is of type `ItemChain`. It represents a folder or
+        directory that needs to be downloaded
+        :type folder: ItemChain
+        """
+
+        print("Downloading...")
+        with profiler.phase("download"):
+            self.jobs = []
+            self.download(folder)
+
+            jobs, self.jobs = self.jobs, []
+            try:
+                asyncio.run(self.download_jobs(jobs))
+            except KeyboardInterrupt:
+                exit(0)
+        print("Downloading is finished")
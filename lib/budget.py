@@ -0,0 +1,35 @@
+from threading import Condition
+
+
+class ByteBudget:
+    def __init__(self, capacity: int or None = None) -> None:
+        # None or 0 means that budget is not limited
+        self.capacity = capacity or None
+        self.used = 0
+        self.condition = Condition()
+
+    def acquire(self, size: int) -> int:
+        """
+        The function `acquire` waits until budget has enough free bytes and takes them.
+        Requests larger than the whole budget are reduced to it, so they wait until budget is empty.
+
+        :param size: Count of bytes to take
+        :type size: int
+        :return: count of bytes that were taken and must be released later
+        """
+
+        if self.capacity is None: return 0
+
+        size = min(size, self.capacity)
+        with self.condition:
+            self.condition.wait_for(lambda: self.used + size <= self.capacity)
+            self.used += size
+
+        return size
+
+    def release(self, size: int) -> None:
+        if self.capacity is None or size == 0: return
+
+        with self.condition:
+            self.used -= size
+            self.condition.notify_all()
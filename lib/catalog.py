@@ -0,0 +1,262 @@
+import os
+import json
+import sqlite3
+import posixpath
+from .item_chain import ItemChain, Item
+
+
+class VersionCatalog:
+    def __init__(self, filepath: str) -> None:
+        self.filepath = filepath
+
+        directory = os.path.dirname(filepath)
+        if (directory):
+            os.makedirs(directory, exist_ok=True)
+
+        self.connection = sqlite3.connect(filepath, check_same_thread=False)
+        self.connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS versions (
+                id INTEGER PRIMARY KEY,
+                server TEXT NOT NULL,
+                sha TEXT NOT NULL,
+                version TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                UNIQUE (server, sha)
+            );
+
+            CREATE TABLE IF NOT EXISTS paths (
+                id INTEGER PRIMARY KEY,
+                path TEXT NOT NULL UNIQUE
+            );
+
+            CREATE TABLE IF NOT EXISTS files (
+                version_id INTEGER NOT NULL REFERENCES versions (id),
+                path_id INTEGER NOT NULL REFERENCES paths (id),
+                sha TEXT NOT NULL,
+                PRIMARY KEY (version_id, path_id)
+            ) WITHOUT ROWID;
+
+            CREATE INDEX IF NOT EXISTS files_sha ON files (sha);
+
+            CREATE TABLE IF NOT EXISTS asset_servers (
+                server TEXT PRIMARY KEY,
+                urls TEXT NOT NULL
+            );
+            """
+        )
+        self.connection.commit()
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def add_fingerprint(self, server: str, fingerprint: dict) -> int or None:
+        """
+        The function `add_fingerprint` stores a fingerprint and all of its file records in the catalog.
+        Fingerprints that are already stored for this server are skipped.
+
+        :param server: Short name of the server the fingerprint belongs to
+        :type server: str
+        :param fingerprint: The `fingerprint` parameter is a dictionary that represents fingerprint data.
+        :type fingerprint: dict
+        :return: id of the stored version or None if fingerprint has no hash
+        """
+
+        sha = fingerprint.get("sha") if fingerprint else None
+        if not sha: return None
+
+        cursor = self.connection.cursor()
+        row = cursor.execute(
+            "SELECT id FROM versions WHERE server = ? AND sha = ?", (server, sha)
+        ).fetchone()
+        if row is not None: return row[0]
+
+        cursor.execute(
+            "INSERT INTO versions (server, sha, version, fingerprint) VALUES (?, ?, ?, ?)",
+            (server, sha, str(fingerprint.get("version") or ""), json.dumps(fingerprint)),
+        )
+        version_id = cursor.lastrowid
+
+        files: list[dict] = fingerprint.get("files") or []
+        paths = [(str(descriptor["file"]),) for descriptor in files]
+        cursor.executemany("INSERT OR IGNORE INTO paths (path) VALUES (?)", paths)
+        cursor.executemany(
+            "INSERT OR REPLACE INTO files (version_id, path_id, sha) "
+            "SELECT ?, id, ? FROM paths WHERE path = ?",
+            [(version_id, str(descriptor["sha"]), str(descriptor["file"])) for descriptor in files],
+        )
+
+        self.connection.commit()
+        return version_id
+
+    def set_asset_servers(self, server: str, urls: list[str]) -> None:
+        """
+        The function `set_asset_servers` remembers the latest known asset servers of server.
+        """
+
+        urls = [url for url in urls if url]
+        if len(urls) == 0: return
+
+        self.connection.execute(
+            "INSERT OR REPLACE INTO asset_servers (server, urls) VALUES (?, ?)", (server, json.dumps(urls))
+        )
+        self.connection.commit()
+
+    def get_asset_servers(self, server: str) -> list[str]:
+        """
+        The function `get_asset_servers` returns the latest known asset servers of server.
+        """
+
+        row = self.connection.execute(
+            "SELECT urls FROM asset_servers WHERE server = ?", (server,)
+        ).fetchone()
+
+        return json.loads(row[0]) if row is not None else []
+
+    def resolve_version(self, server: str, reference: str or None = None) -> tuple[int, str, str] or None:
+        """
+        The function `resolve_version` finds stored version by its fingerprint hash or version string.
+
+        :param server: Short name of the server
+        :type server: str
+        :param reference: Fingerprint hash or version like "1.2.3". If None then the latest stored version is returned
+        :type reference: str or None
+        :return: a tuple of version id, fingerprint hash and version string or None if nothing found
+        """
+
+        if reference is None:
+            # Fingerprints are not stored in version order, for example by --remote-diff or --hash
+            rows = self.connection.execute(
+                "SELECT id, sha, version FROM versions WHERE server = ?", (server,)
+            ).fetchall()
+            if len(rows) == 0: return None
+
+            return max(rows, key=lambda row: (VersionCatalog.version_key(row[2]), row[0]))
+
+        return self.connection.execute(
+            "SELECT id, sha, version FROM versions WHERE server = ? AND (sha = ? OR version = ?) "
+            "ORDER BY id DESC LIMIT 1",
+            (server, reference, reference),
+        ).fetchone()
+
+    def get_fingerprint(self, server: str, reference: str or None = None) -> dict or None:
+        """
+        The function `get_fingerprint` returns stored fingerprint by its hash or version string.
+        """
+
+        version = self.resolve_version(server, reference)
+        if version is None: return None
+
+        row = self.connection.execute(
+            "SELECT fingerprint FROM versions WHERE id = ?", (version[0],)
+        ).fetchone()
+        return json.loads(row[0])
+
+    def get_file_hash(self, version_id: int, path: str) -> str or None:
+        """
+        The function `get_file_hash` returns hash of file content in specified version.
+        """
+
+        row = self.connection.execute(
+            "SELECT files.sha FROM files JOIN paths ON paths.id = files.path_id "
+            "WHERE files.version_id = ? AND paths.path = ?",
+            (version_id, path),
+        ).fetchone()
+
+        return row[0] if row is not None else None
+
+    def get_files(self, version_id: int) -> list[tuple[str, str]]:
+        """
+        The function `get_files` returns all files of stored version as (path, hash) pairs.
+        """
+
+        return self.connection.execute(
+            "SELECT paths.path, files.sha FROM files JOIN paths ON paths.id = files.path_id WHERE files.version_id = ?",
+            (version_id,),
+        ).fetchall()
+
+    def find_servers(self, sha: str) -> list[str]:
+        """
+        The function `find_servers` returns names of servers that have version with specified hash.
+        """
+
+        return [row[0] for row in self.connection.execute(
+            "SELECT server FROM versions WHERE sha = ? ORDER BY id", (sha,)
+        ).fetchall()]
+
+    def list_versions(self, server: str) -> list[tuple[str, str]]:
+        """
+        The function `list_versions` returns all stored versions of server as (hash, version) pairs
+        from the oldest version to the latest one.
+        """
+
+        rows = self.connection.execute(
+            "SELECT id, sha, version FROM versions WHERE server = ?", (server,)
+        ).fetchall()
+        rows.sort(key=lambda row: (VersionCatalog.version_key(row[2]), row[0]))
+
+        return [(sha, version) for _, sha, version in rows]
+
+    @staticmethod
+    def version_key(version: str) -> tuple[int, ...]:
+        """
+        The function `version_key` makes sortable key of version string like "52.1.0".
+        Parts that are not numbers are sorted before any number.
+        """
+
+        return tuple(int(part) if part.isdigit() else -1 for part in version.split("."))
+
+    def diff(self, old_version_id: int, new_version_id: int) -> list[ItemChain, ItemChain, ItemChain]:
+        """
+        The function `diff` compares two stored versions and returns a list of three `ItemChain` objects
+        representing new files, changed files, and deleted files, same as `ScDownloader.make_patch_chain`.
+
+        :param old_version_id: id of the old version
+        :type old_version_id: int
+        :param new_version_id: id of the new version
+        :type new_version_id: int
+        :return: list of new, changed and deleted files chains
+        """
+
+        new_rows = self.connection.execute(
+            "SELECT paths.path, new.sha FROM files AS new "
+            "JOIN paths ON paths.id = new.path_id "
+            "LEFT JOIN files AS old ON old.version_id = ? AND old.path_id = new.path_id "
+            "WHERE new.version_id = ? AND old.path_id IS NULL",
+            (old_version_id, new_version_id),
+        ).fetchall()
+
+        changed_rows = self.connection.execute(
+            "SELECT paths.path, new.sha FROM files AS new "
+            "JOIN files AS old ON old.version_id = ? AND old.path_id = new.path_id "
+            "JOIN paths ON paths.id = new.path_id "
+            "WHERE new.version_id = ? AND old.sha != new.sha",
+            (old_version_id, new_version_id),
+        ).fetchall()
+
+        deleted_rows = self.connection.execute(
+            "SELECT paths.path, old.sha FROM files AS old "
+            "JOIN paths ON paths.id = old.path_id "
+            "LEFT JOIN files AS new ON new.version_id = ? AND new.path_id = old.path_id "
+            "WHERE old.version_id = ? AND new.path_id IS NULL",
+            (new_version_id, old_version_id),
+        ).fetchall()
+
+        return [VersionCatalog.make_chain(rows) for rows in (new_rows, changed_rows, deleted_rows)]
+
+    @staticmethod
+    def make_chain(rows: list[tuple[str, str]]) -> ItemChain:
+        """
+        The function `make_chain` builds `ItemChain` hierarchy from list of (path, hash) pairs.
+        """
+
+        root = ItemChain("")
+
+        for path, hash in rows:
+            dirname, basename = posixpath.split(path)
+            folder_name_chain = dirname.split("/") if dirname else []
+
+            folder: ItemChain = root.get_chain(folder_name_chain, True)
+            folder.items.append(Item(basename, hash))
+
+        return root
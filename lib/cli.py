@@ -0,0 +1,238 @@
+import argparse
+from .config import Config, ServerDescriptor
+from .path_filter import PathFilter
+
+
+def make_parser() -> argparse.ArgumentParser:
+    """
+    The function `make_parser` creates parser of command line arguments.
+    :return: an instance of argparse.ArgumentParser
+    """
+
+    parser = argparse.ArgumentParser(
+        prog="SC-Downloader", description="Asset Downloader for Supercell Games"
+    )
+
+    parser.add_argument(
+        "--hash",
+        type=str,
+        help="Specify your version hash by which you want to download assets",
+        default=None,
+    )
+
+    parser.add_argument(
+        "--asset-servers",
+        help="You can provide your own links to asset servers",
+        nargs="+",
+        default=None,
+    )
+
+    parser.add_argument(
+        "--repair-mode",
+        action=argparse.BooleanOptionalAction,
+        help="Checks if all files exist and loads them if they are missing",
+        default=False,
+    )
+
+    parser.add_argument(
+        "--strict-repair-mode",
+        action=argparse.BooleanOptionalAction,
+        help="Checks file content and if it is corrupted, downloads it again. Much slower than default mode.",
+        default=False,
+    )
+
+    parser.add_argument(
+        "--repair-state",
+        action=argparse.BooleanOptionalAction,
+        help="Strict repair mode that does not hash folders again if they were verified before and their files kept size and modification time. "
+             "Faster, but does not detect corruption that keeps them",
+        default=False,
+    )
+
+    parser.add_argument(
+        "--list-versions",
+        action=argparse.BooleanOptionalAction,
+        help="Prints all versions of server that are stored in version catalog",
+        default=False,
+    )
+
+    parser.add_argument(
+        "--diff-versions",
+        help="Makes patch between two stored versions by their hashes or version numbers without network access",
+        nargs=2,
+        metavar=("OLD", "NEW"),
+        default=None,
+    )
+
+    parser.add_argument(
+        "--remote-diff",
+        help="Compares two versions by their hashes using only fingerprints from asset servers and prints size of the update",
+        nargs=2,
+        metavar=("OLD_HASH", "NEW_HASH"),
+        default=None,
+    )
+
+    parser.add_argument(
+        "--check-all",
+        action=argparse.BooleanOptionalAction,
+        help="Checks all servers from config for updates at once and offers to download them",
+        default=False,
+    )
+
+    parser.add_argument(
+        "--extract",
+        metavar="VERSION",
+        help="Extracts stored version by its hash or version number from archive and local assets. Use --include to extract only some files",
+        default=None,
+    )
+
+    parser.add_argument(
+        "--rollback",
+        action=argparse.BooleanOptionalAction,
+        help="Switches assets back to the previous retained version. Works only with staged updates",
+        default=False,
+    )
+
+    parser.add_argument(
+        "--shard",
+        type=int,
+        nargs=2,
+        metavar=("INDEX", "COUNT"),
+        help="Downloads only one of COUNT parts of assets into shared folder. The last node to finish verifies all files and writes fingerprint.json",
+        default=None,
+    )
+
+    parser.add_argument(
+        "--serve",
+        type=int,
+        metavar="PORT",
+        help="Serves local assets over HTTP for other instances, missing files are downloaded from asset servers once",
+        default=None,
+    )
+
+    parser.add_argument(
+        "--serve-host",
+        type=str,
+        help="Address to bind the asset server to",
+        default="",
+    )
+
+    parser.add_argument(
+        "--profile",
+        metavar="PATH",
+        nargs="?",
+        const="profile.txt",
+        help="Measures wall time, CPU time and peak memory of every phase and writes report to PATH (profile.txt by default)",
+        default=None,
+    )
+
+    parser.add_argument(
+        "--profile-cprofile",
+        action=argparse.BooleanOptionalAction,
+        help="Adds cProfile statistics to profile report",
+        default=False,
+    )
+
+    parser.add_argument(
+        "--profile-memory",
+        action=argparse.BooleanOptionalAction,
+        help="Traces peak memory of every phase with tracemalloc. Makes everything noticeably slower",
+        default=False,
+    )
+
+    parser.add_argument(
+        "--include",
+        help="Glob patterns of asset paths to sync, for example \"csv_logic/\" \"sc/*.sc\". Overrides config",
+        nargs="+",
+        default=None,
+    )
+
+    parser.add_argument(
+        "--exclude",
+        help="Glob patterns of asset paths to skip. Overrides config",
+        nargs="+",
+        default=None,
+    )
+
+
+    return parser
+
+
+def apply_args(config: Config, argv: list[str] or None = None) -> Config:
+    """
+    The function `apply_args` parses command line arguments and applies them to config as session settings.
+    
+    :param config: Config loaded from file
+    :type config: Config
+    :param argv: Arguments to parse, `sys.argv` is used by default
+    :type argv: list[str] or None
+    :return: the same config instance
+    """
+
+    args = make_parser().parse_args(argv)
+
+    config.custom_hash = args.hash or ""
+    config.asset_servers_override = args.asset_servers
+
+    config.repair_state = args.repair_state
+    config.strict_repair = args.strict_repair_mode or config.repair_state
+    config.repair = args.repair_mode or config.strict_repair
+
+    config.list_versions = args.list_versions
+    config.diff_versions = args.diff_versions
+    config.rollback = args.rollback
+    config.remote_diff = args.remote_diff
+    config.check_all = args.check_all
+    config.extract_version = args.extract
+
+    config.shard = args.shard
+    config.serve_port = args.serve
+    config.serve_host = args.serve_host
+
+    config.profile_path = args.profile
+    config.profile_cprofile = args.profile_cprofile
+    config.profile_memory = args.profile_memory
+
+    config.path_filter = PathFilter(
+        args.include if args.include is not None else config.path_filter.include,
+        args.exclude if args.exclude is not None else config.path_filter.exclude,
+    )
+
+    return config
+
+
+def ask_server(config: Config) -> ServerDescriptor:
+    """
+    The function `ask_server` prints all servers from config and asks user to choose one.
+    
+    :param config: Loaded config
+    :type config: Config
+    :return: descriptor of the chosen server
+    """
+
+    print("Choose server to connect: ")
+
+    for i, descriptor in enumerate(config.servers):
+        print(f'{i}. "{descriptor.short_name}": {descriptor.server_address}"')
+
+    server_index = int(input("\nServer index: "))
+    return config.servers[server_index]
+
+
+def ask_question_bool(question: str) -> bool:
+    """
+    The function `ask_question_bool` prompts the user with a question and returns a boolean value
+    based on their response.
+    
+    :param question: A string representing the question that will be asked to the user
+    :type question: str
+    :return: The function `ask_question_bool` returns a boolean value.
+    """
+
+    answer = str(input(f"{question} (yes/no): ")).lower()
+    
+    if answer.startswith("y"): return True
+    if answer.startswith("n"): return False
+    
+    if answer.isdigit():
+        return int(answer) >= 1
@@ -1,13 +1,18 @@
+from __future__ import annotations
 import os
-from socket import socket, create_connection
 import json
 from struct import unpack
 from .writer import Writer
 from .reader import Reader
+from .profiler import profiler
 import zlib
 
 from enum import Enum
 
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from socket import socket
+
 
 class HelloServerResponse(Enum):
     Success = 7
@@ -28,6 +33,10 @@ class Client:
         self.assets_url_2 = ""
         self.content_url = ""
 
+        # Timeouts in seconds, None means waiting forever
+        self.connect_timeout: float or None = 10
+        self.read_timeout: float or None = 30
+
         self.fingerprint: dict = {}
         if os.path.exists(self.fingerprint_filepath):
             data_file = open(self.fingerprint_filepath, "rb")
@@ -65,23 +74,30 @@ class Client:
 
         return received_data
 
-    def send_packet(self, id: int, data: bytes) -> bytes:
+    @staticmethod
+    def make_packet(id: int, data: bytes) -> bytes:
         packet = Writer()
         packet.writeUShort(id)
         packet.buffer += len(data).to_bytes(3, "big")
         packet.writeUShort(0)
         packet.buffer += data
-        self.socket.send(packet.buffer)
+
+        return packet.buffer
+
+    def send_packet(self, id: int, data: bytes) -> bytes:
+        self.socket.send(self.make_packet(id, data))
 
         return self.handle_packet()
     
     def disconnect(self) -> None:
         self.socket.close()
 
-    def connect(self, address: str) -> HelloServerResponse:
-        self.socket = create_connection((address, 9339))
+    def make_hello(self) -> bytes:
+        """
+        The function `make_hello` serializes HelloMessage with content version of client.
+        :return: packet payload
+        """
 
-        # HelloMessage
         stream = Writer()
 
         stream.writeUInt32(0)  # Protocol Version
@@ -93,7 +109,55 @@ class Client:
         stream.writeUInt32(2)  # DeviceType
         stream.writeUInt32(2)  # AppStore
 
-        server_data_buffer = self.send_packet(10100, stream.buffer)
+        return stream.buffer
+
+    def connect(self, address: str) -> HelloServerResponse:
+        from socket import create_connection
+
+        self.socket = create_connection((address, 9339), timeout=self.connect_timeout)
+        self.socket.settimeout(self.read_timeout)
+
+        try:
+            server_data_buffer = self.send_packet(10100, self.make_hello())
+        finally:
+            self.disconnect()
+
+        return self.read_hello(address, server_data_buffer)
+
+    async def connect_async(self, address: str) -> HelloServerResponse:
+        """
+        The function `connect_async` makes the same hello exchange as `connect` in event loop,
+        so many servers can be checked at once.
+
+        :param address: Address of game server
+        :type address: str
+        :return: status of hello response
+        """
+
+        # asyncio is slow to import and is not needed for blocking connection
+        import asyncio
+
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(address, 9339), self.connect_timeout
+        )
+
+        try:
+            writer.write(self.make_packet(10100, self.make_hello()))
+            await asyncio.wait_for(writer.drain(), self.read_timeout)
+
+            header = await asyncio.wait_for(reader.readexactly(7), self.read_timeout)
+            packet_length = int.from_bytes(header[2:5], "big")
+            server_data_buffer = await asyncio.wait_for(reader.readexactly(packet_length), self.read_timeout)
+        finally:
+            writer.close()
+
+        return self.read_hello(address, server_data_buffer)
+
+    def read_hello(self, address: str, server_data_buffer: bytes) -> HelloServerResponse:
+        """
+        The function `read_hello` parses response to HelloMessage and loads fingerprint and asset servers from it.
+        """
+
         server_data_stream = Reader(server_data_buffer)
 
         if self.dump:
@@ -114,28 +178,29 @@ class Client:
 
             serialized_fingerprint = server_data_stream.readString()
 
-            # If decompressed data length is 0 then decompress data with zlib
-            if len(serialized_fingerprint) == 0:
-                # Skip zeros bytes
-                server_data_stream.seek(5, 1)
+            with profiler.phase("fingerprint decode"):
+                # If decompressed data length is 0 then decompress data with zlib
+                if len(serialized_fingerprint) == 0:
+                    # Skip zeros bytes
+                    server_data_stream.seek(5, 1)
 
-                # decompressInMySQLFormat
-                compressed_data_length = server_data_stream.readUInt32()
-                # For some reason decompressed size is in Little Endian
-                decompressed_data_length = unpack("<I", server_data_stream.read(4))[0]
+                    # decompressInMySQLFormat
+                    compressed_data_length = server_data_stream.readUInt32()
+                    # For some reason decompressed size is in Little Endian
+                    decompressed_data_length = unpack("<I", server_data_stream.read(4))[0]
 
-                compressed_data = server_data_stream.read(compressed_data_length)
-                decompressed_data = zlib.decompress(compressed_data)
+                    compressed_data = server_data_stream.read(compressed_data_length)
+                    decompressed_data = zlib.decompress(compressed_data)
 
-                if len(decompressed_data) != decompressed_data_length:
-                    print("Data may be corrupted but we try to deserialize it anyway")
+                    if len(decompressed_data) != decompressed_data_length:
+                        print("Data may be corrupted but we try to deserialize it anyway")
 
-                serialized_fingerprint = decompressed_data.decode("utf8")
+                    serialized_fingerprint = decompressed_data.decode("utf8")
 
-            #with open(self.fingerprint_filepath, "w", encoding="utf8") as file:
-            #    file.write(serialized_fingerprint)
+                #with open(self.fingerprint_filepath, "w", encoding="utf8") as file:
+                #    file.write(serialized_fingerprint)
 
-            self.fingerprint = json.loads(serialized_fingerprint)
+                self.fingerprint = json.loads(serialized_fingerprint)
 
             self.assets_url = server_data_stream.readString()
             self.assets_url_2 = server_data_stream.readString()
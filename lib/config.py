@@ -1,6 +1,6 @@
+from __future__ import annotations
 import json
-import argparse
-from enum import Enum
+from .path_filter import PathFilter
 
 class ServerDescriptor:
     def __init__(self, name: str = "", address: str = "") -> None:
@@ -8,10 +8,8 @@ class ServerDescriptor:
         self.server_address = address
 
 class Config:
-    def __init__(self, filepath: str) -> None:
-        file = open(filepath, "rb")
-        data: dict = json.load(file)
-        file.close()
+    def __init__(self, data: dict or None = None) -> None:
+        data = data or {}
 
         # self.server_specific_data: dict = data["server_specific_data"]
         self.save_dump = True if data.get("save_dump") else False
@@ -22,50 +20,52 @@ class Config:
         )
         self.max_workers = data.get("max_workers") or 1
         self.worker_max_items = data.get("worker_max_items") or 1
+        self.download_backend: str = data.get("download_backend") or "threads"
+        self.async_max_requests: int = data.get("async_max_requests") or 256
+        self.async_max_connections: int = data.get("async_max_connections") or 64
+        self.max_inflight_bytes: int = data.get("max_inflight_bytes", 64 * 1024 ** 2)
+        self.catalog_path = data.get("catalog_path") or "catalog.db"
+        self.staged_updates = True if data.get("staged_updates") else False
+        self.keep_versions: int = data.get("keep_versions", 2)
+        self.proxy_cache_path = data.get("proxy_cache_path") or "proxy_cache"
+        self.decompress_assets = True if data.get("decompress_assets") else False
+        self.decompressed_path = data.get("decompressed_path") or "decompressed"
+        self.decompress_workers: int or None = data.get("decompress_workers") or None
+        self.archive_versions = True if data.get("archive_versions") else False
+        self.archive_path = data.get("archive_path") or "archive"
+        self.archive_level: int = data.get("archive_level") or 10
+        self.extract_path = data.get("extract_path") or "extracted"
+        self.shard_lock_timeout: float = data.get("shard_lock_timeout") or 3600
+        self.connect_timeout: float = data.get("connect_timeout") or 10
+        self.read_timeout: float = data.get("read_timeout") or 30
 
-        servers_data: dict = data.get("servers")
+        servers_data: dict = data.get("servers") or {}
         self.servers: list[ServerDescriptor] = []
 
-        # Session Settings
-        parser = argparse.ArgumentParser(
-            prog="SC-Downloader", description="Asset Downloader for Supercell Games"
-        )
-
-        parser.add_argument(
-            "--hash",
-            type=str,
-            help="Specify your version hash by which you want to download assets",
-            default=None,
-        )
+        # Session Settings, can be changed by command line arguments
+        self.custom_hash: str = ""
+        self.asset_servers_override: list[str] or None = None
 
-        parser.add_argument(
-            "--asset-servers",
-            help="You can provide your own links to asset servers",
-            nargs="+",
-            default=None,
-        )
+        self.strict_repair: bool = False
+        self.repair: bool = False
+        self.repair_state: bool = False
 
-        parser.add_argument(
-            "--repair-mode",
-            action=argparse.BooleanOptionalAction,
-            help="Checks if all files exist and loads them if they are missing",
-            default=False,
-        )
-
-        parser.add_argument(
-            "--strict-repair-mode",
-            action=argparse.BooleanOptionalAction,
-            help="Checks file content and if it is corrupted, downloads it again. Much slower than default mode.",
-            default=False,
-        )
+        self.list_versions: bool = False
+        self.diff_versions: list[str] or None = None
+        self.rollback: bool = False
+        self.remote_diff: list[str] or None = None
+        self.check_all: bool = False
+        self.extract_version: str or None = None
 
-        args = parser.parse_args()
+        self.shard: list[int] or None = None
+        self.serve_port: int or None = None
+        self.serve_host: str = ""
 
-        self.custom_hash: str = "" or args.hash
-        self.asset_servers_override = args.asset_servers
+        self.profile_path: str or None = None
+        self.profile_cprofile: bool = False
+        self.profile_memory: bool = False
 
-        self.strict_repair: bool = args.strict_repair_mode
-        self.repair: bool = args.repair_mode or self.strict_repair
+        self.path_filter = PathFilter(data.get("include_paths"), data.get("exclude_paths"))
         
         # Server specific variables
         self.status_code_size = 4 # int
@@ -73,6 +73,30 @@ class Config:
 
         for server in servers_data:
             self.servers.append(ServerDescriptor(server, servers_data[server]))
+
+    @staticmethod
+    def load(filepath: str) -> Config:
+        """
+        The function `load` creates config from json file.
+        
+        :param filepath: Path to config file
+        :type filepath: str
+        :return: an instance of the Config class
+        """
+
+        with open(filepath, "rb") as file:
+            return Config(json.load(file))
+
+    def get_server(self, name: str) -> ServerDescriptor or None:
+        """
+        The function `get_server` returns server descriptor by its short name.
+        """
+
+        for server in self.servers:
+            if server.short_name == name:
+                return server
+
+        return None
             
     def load_server_specific_data(self, name: str) -> None:
         data = self.server_specific_data
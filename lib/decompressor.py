@@ -0,0 +1,156 @@
+import os
+import lzma
+import multiprocessing
+from struct import unpack
+from concurrent.futures import Future, ProcessPoolExecutor
+from threading import Lock
+
+LZMA_MAGIC = b"\x5d\x00\x00"
+LZHAM_MAGIC = b"SCLZ"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+def decompress_lzma(data: bytes) -> bytes:
+    # Supercell writes only 4 bytes of decompressed size instead of 8
+    padding = b"\xff" * 4 if data[5:9] == b"\xff" * 4 else b"\x00" * 4
+    return lzma.decompress(data[:9] + padding + data[9:], format=lzma.FORMAT_ALONE)
+
+
+def decompress_zstd(data: bytes) -> bytes or None:
+    try:
+        import zstandard
+    except ImportError:
+        return None
+
+    return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+
+
+def decompress(data: bytes) -> bytes or None:
+    """
+    The function `decompress` detects Supercell compression header and decompresses data.
+    Supports LZMA and Zstandard, Zstandard needs `zstandard` module to be installed.
+
+    :param data: Content of asset file
+    :type data: bytes
+    :return: decompressed data or None if data is not compressed or compression is not supported
+    """
+
+    # Signed files
+    if data.startswith(b"Sig:"):
+        data = data[68:]
+
+    if data.startswith(b"SC"):
+        version = unpack(">I", data[2:6])[0]
+        offset = 6
+        if version == 4:
+            version = unpack(">I", data[6:10])[0]
+            offset = 10
+
+        hash_length = unpack(">I", data[offset:offset + 4])[0]
+        data = data[offset + 4 + hash_length:]
+
+        # Version 4 files have metadata after compressed data
+        if version == 4 or b"START" in data[-1024:]:
+            metadata_start = data.rfind(b"START")
+            if metadata_start != -1:
+                data = data[:metadata_start]
+
+        if data.startswith(LZHAM_MAGIC):
+            return None
+
+    if data.startswith(ZSTD_MAGIC):
+        return decompress_zstd(data)
+
+    if data.startswith(LZMA_MAGIC) and len(data) > 13:
+        return decompress_lzma(data)
+
+    return None
+
+
+def decompress_file(source: str, destination: str) -> bool:
+    """
+    The function `decompress_file` writes decompressed copy of asset file.
+
+    :return: True if file was compressed and its decompressed copy is written
+    """
+
+    with open(source, "rb") as file:
+        data = file.read()
+
+    try:
+        decompressed_data = decompress(data)
+    except (lzma.LZMAError, ValueError, IndexError):
+        decompressed_data = None
+
+    if decompressed_data is None:
+        # Copy left from previous version of file would be taken for decompression of current one
+        try:
+            os.remove(destination)
+        except FileNotFoundError:
+            pass
+
+        return False
+
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    with open(destination, "wb") as file:
+        file.write(decompressed_data)
+
+    return True
+
+
+class DecompressionPipeline:
+    def __init__(self, assets_path: str, output_path: str, max_workers: int or None = None) -> None:
+        self.assets_path = assets_path
+        self.output_path = output_path
+        self.max_workers = max_workers
+
+        # Worker processes are started lazily by first submits, which come from running downloader threads.
+        # Forking a process with running threads may deadlock, so workers must be spawned instead
+        self.executor = ProcessPoolExecutor(max_workers, mp_context=multiprocessing.get_context("spawn"))
+        self.futures: list[Future] = []
+        self.lock = Lock()
+
+    def submit(self, base_filepath: str) -> None:
+        """
+        The function `submit` queues decompression of downloaded file in process pool.
+
+        :param base_filepath: Asset path relative to assets folder
+        :type base_filepath: str
+        """
+
+        with self.lock:
+            self.futures.append(self.executor.submit(
+                decompress_file,
+                os.path.join(self.assets_path, base_filepath),
+                os.path.join(self.output_path, base_filepath),
+            ))
+
+    def remove(self, base_filepath: str) -> None:
+        """
+        The function `remove` removes decompressed copy of asset that was deleted.
+        """
+
+        try:
+            os.remove(os.path.join(self.output_path, base_filepath))
+        except FileNotFoundError:
+            pass
+
+    def close(self) -> None:
+        """
+        The function `close` waits for all queued files and stops process pool.
+        """
+
+        with self.lock:
+            futures, self.futures = self.futures, []
+
+        decompressed_count = 0
+        for future in futures:
+            try:
+                decompressed_count += int(future.result())
+            except Exception as exception:
+                print(f"[Decompressor] Failed to decompress file: {exception}")
+
+        self.executor.shutdown()
+        if len(futures) == 0: return
+
+        print(f"[Decompressor] Decompressed {decompressed_count} of {len(futures)} files")
@@ -1,11 +1,25 @@
+from __future__ import annotations
 from .item_chain import ItemChain, Item
-from threading import Thread
+from .budget import ByteBudget
+from .profiler import profiler
+from threading import Thread, Lock
 import os
+import json
 import posixpath
-import requests
 from hashlib import sha1
 
+# requests is slow to import, so it is imported only when the first request is made
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    import requests
+
+# Size of pieces in which response bodies are read and written
+CHUNK_SIZE = 64 * 1024
+
 class DownloaderWorker(Thread):
+    session: requests.Session or None = None
+    session_lock = Lock()
+
     def __init__(
         self,
         content_hash: str,
@@ -13,6 +27,8 @@ class DownloaderWorker(Thread):
         assets_path: str,
         assets_basepath: str,
         folder: ItemChain,
+        pipelines: list or None = None,
+        budget: ByteBudget or None = None,
     ) -> None:
         Thread.__init__(self)
         self.is_working = True
@@ -21,14 +37,39 @@ class DownloaderWorker(Thread):
         self.folder = folder
         self.content_hash = content_hash
         self.assets_urls = assets_urls
+        self.pipelines = pipelines or []
+        self.budget = budget or ByteBudget()
     
+    @staticmethod
+    def get_session() -> requests.Session:
+        """
+        The function `get_session` returns session shared by all workers, so connections to asset servers
+        are pooled and reused between requests.
+        :return: shared instance of requests.Session
+        """
+
+        with DownloaderWorker.session_lock:
+            if DownloaderWorker.session is None:
+                import requests
+                import requests.adapters
+
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=64)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                DownloaderWorker.session = session
+
+        return DownloaderWorker.session
+
     @staticmethod
     def download_file(urls: list[str], conent_hash: str, filepath: str) -> bytes or int:
         request: requests.Response = None
+        session = DownloaderWorker.get_session()
         for url in urls:
-            request = requests.get(
-                f"{url}/{conent_hash}/{filepath}"
-            )
+            with profiler.phase("network"):
+                request = session.get(
+                    f"{url}/{conent_hash}/{filepath}"
+                )
             if request.status_code == 200: break
 
         # Final writing to file
@@ -37,6 +78,136 @@ class DownloaderWorker(Thread):
         else:
             return request.status_code
     
+    @staticmethod
+    def get_file_size(urls: list[str], conent_hash: str, filepath: str) -> int or None:
+        """
+        The function `get_file_size` asks asset servers for size of file without downloading it.
+        :return: file size from Content-Length header or None if it is unknown
+        """
+
+        return DownloaderWorker.head_file(urls, conent_hash, filepath)[1]
+    
+    @staticmethod
+    def head_file(urls: list[str], conent_hash: str, filepath: str) -> tuple[int, int or None]:
+        """
+        The function `head_file` makes HEAD request to asset servers in order until one of them has file.
+        :return: status code of the last response and file size from Content-Length header or None if it is unknown
+        """
+
+        status_code = 404
+        session = DownloaderWorker.get_session()
+        for url in urls:
+            request = session.head(f"{url}/{conent_hash}/{filepath}", allow_redirects=True)
+            status_code = request.status_code
+            if status_code != 200: continue
+
+            content_length = request.headers.get("Content-Length")
+            if content_length is not None and content_length.isdigit():
+                return (200, int(content_length))
+
+            return (200, None)
+
+        return (status_code, None)
+    
+    @staticmethod
+    def finish_file(assets_path: str, base_filepath: str, pipelines: list) -> None:
+        """
+        The function `finish_file` replaces file with its written ".part" copy and passes it to all pipeline stages.
+        """
+
+        filepath = os.path.join(assets_path, base_filepath)
+        with profiler.phase("disk write"):
+            os.replace(f"{filepath}.part", filepath)
+        
+        for pipeline in pipelines:
+            pipeline.submit(base_filepath)
+    
+    @staticmethod
+    def write_chunk(file, chunk: bytes) -> None:
+        with profiler.phase("disk write"):
+            file.write(chunk)
+    
+    @staticmethod
+    def remove_part(filepath: str) -> None:
+        """
+        The function `remove_part` removes ".part" copy of file left by interrupted transfer.
+        """
+
+        try:
+            os.remove(f"{filepath}.part")
+        except FileNotFoundError:
+            pass
+    
+    @staticmethod
+    def stream_file(
+        urls: list[str],
+        conent_hash: str,
+        assets_path: str,
+        base_filepath: str,
+        budget: ByteBudget,
+    ) -> int:
+        """
+        The function `stream_file` downloads file to its ".part" copy by chunks, so whole body is never
+        held in memory. Bytes from Content-Length are taken from budget before body is read and are
+        released as chunks are written, files without Content-Length take budget chunk by chunk.
+        
+        :param urls: Asset servers
+        :type urls: list[str]
+        :param conent_hash: Version hash
+        :type conent_hash: str
+        :param assets_path: Assets folder
+        :type assets_path: str
+        :param base_filepath: Asset path relative to assets folder
+        :type base_filepath: str
+        :param budget: Budget shared by all workers
+        :type budget: ByteBudget
+        :return: status code of response
+        """
+
+        response: requests.Response = None
+        session = DownloaderWorker.get_session()
+        for url in urls:
+            with profiler.phase("network"):
+                response = session.get(f"{url}/{conent_hash}/{base_filepath}", stream=True)
+            if response.status_code == 200: break
+            response.close()
+
+        if response.status_code != 200:
+            return response.status_code
+
+        content_length = response.headers.get("Content-Length")
+        reserved = 0
+        if content_length is not None and content_length.isdigit():
+            with profiler.phase("budget wait"):
+                reserved = budget.acquire(int(content_length))
+
+        filepath = os.path.join(assets_path, base_filepath)
+        try:
+            with response, open(f"{filepath}.part", "wb") as file:
+                chunks = response.iter_content(CHUNK_SIZE)
+                while True:
+                    # Body is longer than budget or its length is unknown
+                    if reserved == 0:
+                        with profiler.phase("budget wait"):
+                            reserved = budget.acquire(CHUNK_SIZE)
+
+                    with profiler.phase("network"):
+                        chunk = next(chunks, None)
+                    if chunk is None: break
+
+                    DownloaderWorker.write_chunk(file, chunk)
+                    released = min(reserved, len(chunk))
+                    budget.release(released)
+                    reserved -= released
+        except BaseException:
+            # Partial body must not be left on disk, it would be taken for a real file by next run
+            DownloaderWorker.remove_part(filepath)
+            raise
+        finally:
+            budget.release(reserved)
+
+        return 200
+    
     def run(self):
         """
         The function downloads files from multiple URLs and saves them to a specified directory,
@@ -53,15 +224,15 @@ class DownloaderWorker(Thread):
 
             base_filepath = posixpath.join(self.assets_basepath, item.name)
             
-            server_response = DownloaderWorker.download_file(self.assets_urls, self.content_hash, base_filepath)
+            status_code = DownloaderWorker.stream_file(
+                self.assets_urls, self.content_hash, self.assets_path, base_filepath, self.budget
+            )
             
-            if (isinstance(server_response, bytes)):
-                with open(os.path.join(self.assets_path, base_filepath), "wb") as file:
-                    file.write(server_response)
-                
+            if (status_code == 200):
+                DownloaderWorker.finish_file(self.assets_path, base_filepath, self.pipelines)
                 self.message(f"Downloaded {base_filepath}")
             else:
-                self.message(f"Failed to download \"{base_filepath}\" with code {server_response}")
+                self.message(f"Failed to download \"{base_filepath}\" with code {status_code}")
 
         self.message("Done")
         self.is_working = False
@@ -94,8 +265,29 @@ class Downloader:
                  output_folder: str,
                  max_workers=8,
                  worker_max_items=50,
-                 strict_level = 0) -> None:
+                 strict_level = 0,
+                 pipelines: list or None = None,
+                 max_inflight_bytes: int or None = None) -> None:
         self.workers: list[DownloaderWorker] = []
+        
+        # Bytes of response bodies that all workers may have in flight at once
+        self.max_inflight_bytes = max_inflight_bytes
+        self.budget = ByteBudget(max_inflight_bytes)
+        
+        # Stages that are called for every successfully written file
+        self.pipelines = pipelines or []
+        
+        # Full fingerprint tree and files found in repair mode that are not listed in it
+        self.known_chain: ItemChain or None = None
+        self.stray_files: list[str] = []
+        
+        # Folders whose files were verified by content in strict repair mode. Each folder path is mapped to
+        # digest of files from fingerprint and digest of local files state at the moment of verification
+        self.repair_state: dict[str, list[str]] = {}
+        self.verified_state: dict[str, list[str]] = {}
+        
+        # Whether folders verified before are trusted by size and modification time instead of being hashed again
+        self.use_repair_state = False
         self.max_workers = max_workers
         self.worker_max_items = worker_max_items
         self.output_folder = output_folder
@@ -117,6 +309,8 @@ class Downloader:
         
         # Version info
         folder.items.append(Item("version.number", ""))
+        
+        folder.digest = None
 
     def check_workers_status(self) -> bool:
         """
@@ -174,7 +368,9 @@ class Downloader:
             self.content_urls,
             self.output_folder,
             basepath,
-            chain
+            chain,
+            self.pipelines,
+            self.budget
         )
         
         print(f"[Main] {chain.name or 'Assets'} folder added to download queue")
@@ -194,8 +390,89 @@ class Downloader:
             
         self.wait_for_workers()
 
+    @staticmethod
+    def scan_folder(path: str) -> dict[str, os.DirEntry] or None:
+        """
+        The function `scan_folder` lists folder once and returns its entries by name.
+        
+        :param path: Path to folder
+        :type path: str
+        :return: a dictionary of folder entries or None if folder does not exist
+        """
+
+        try:
+            with os.scandir(path) as iterator:
+                return {entry.name: entry for entry in iterator}
+        except FileNotFoundError:
+            return None
+    
+    @staticmethod
+    def get_files_digest(folder: ItemChain) -> str:
+        """
+        The function `get_files_digest` returns digest of names and hashes of files in folder, without subfolders.
+        """
+
+        digest = sha1()
+        for item in sorted(folder.items, key=lambda item: item.name):
+            if isinstance(item, Item):
+                digest.update(f"{item.name}\0{item.hash}\n".encode("utf8"))
+
+        return digest.hexdigest()
+
+    @staticmethod
+    def get_local_digest(folder: ItemChain, entries: dict[str, os.DirEntry]) -> str:
+        """
+        The function `get_local_digest` returns digest of names, sizes and modification times of local files
+        that are listed in folder. Digest is changed if any of these files is changed, added or removed.
+        """
+
+        digest = sha1()
+        for item in sorted(folder.items, key=lambda item: item.name):
+            if not isinstance(item, Item): continue
+            
+            entry = entries.get(item.name)
+            if entry is None or not entry.is_file():
+                digest.update(f"{item.name}\0-\n".encode("utf8"))
+                continue
+            
+            stat = entry.stat()
+            digest.update(f"{item.name}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode("utf8"))
+
+        return digest.hexdigest()
+
+    def load_repair_state(self) -> None:
+        try:
+            with open(os.path.join(self.output_folder, ".repair_state.json"), "r") as file:
+                self.repair_state = json.load(file)
+        except (OSError, ValueError):
+            self.repair_state = {}
+        
+        self.verified_state = {}
+
+    def save_repair_state(self) -> None:
+        with open(os.path.join(self.output_folder, ".repair_state.json"), "w") as file:
+            json.dump(self.verified_state, file)
+
+    def find_stray_files(self, folder: ItemChain, basepath: str, entries: dict[str, os.DirEntry]) -> None:
+        """
+        The function `find_stray_files` remembers all files and folders from scanned folder that are not listed in fingerprint.
+        """
+
+        known_folder = folder
+        if self.known_chain is not None:
+            known_folder = self.known_chain.get_chain(basepath.split("/") if basepath else []) or folder
+        
+        known_names = {item.name for item in known_folder.items}
+        if not basepath:
+            known_names.update(("fingerprint.json", "version.number"))
+        
+        for name, entry in entries.items():
+            if name in known_names or name.startswith("."): continue
+            
+            self.stray_files.append(posixpath.join(basepath, name) + ("/" if entry.is_dir() else ""))
+
     @DownloaderDecorator
-    def download(self, folder: ItemChain, basepath: str = "") -> None:
+    def download(self, folder: ItemChain, basepath: str = "", folder_exists: bool = True) -> None:
         """
         The `download` function takes a folder and downloads its contents, splitting them into worker
         chunks to be downloaded concurrently.
@@ -206,16 +483,39 @@ class Downloader:
         :param basepath: The `basepath` parameter is a string that represents the base path where the
         items will be downloaded. It is used to create the directory structure for the downloaded items
         :type basepath: str
+        :param folder_exists: False if it is already known that folder does not exist, so it is not scanned
+        :type folder_exists: bool
         """
 
         # Folders prepare
         current_dir = os.path.join(self.output_folder, basepath)
-        os.makedirs(
-            current_dir, exist_ok=True
-        )
+        
+        # In repair mode folder is listed only once instead of checking every file
+        entries: dict[str, os.DirEntry] = {}
+        if (self.strict_level >= 1 and folder_exists):
+            entries = Downloader.scan_folder(current_dir)
+            
+            if (entries is None):
+                folder_exists = False
+                entries = {}
+            else:
+                self.find_stray_files(folder, basepath, entries)
+        
+        if (self.strict_level == 0 or not folder_exists):
+            os.makedirs(
+                current_dir, exist_ok=True
+            )
+        
+        # Files are not hashed again if they were verified and were not changed since then, only if it is allowed
+        folder_state: list[str] or None = None
+        is_verified_folder = False
+        if (self.strict_level >= 2 and folder_exists):
+            folder_state = [Downloader.get_files_digest(folder), Downloader.get_local_digest(folder, entries)]
+            is_verified_folder = self.use_repair_state and self.repair_state.get(basepath) == folder_state
         
         # worker_max_items sorting & existing files removing
         worker_chunks: list[ItemChain] = []
+        has_invalid_files = False
         
         i = 0
         temp_chunk = ItemChain(folder.name)
@@ -227,16 +527,21 @@ class Downloader:
             
             valid_file = False
             if (self.strict_level >= 1):
-                valid_file = os.path.exists(asset_path) and len(item.hash) != 0 
+                entry = entries.get(item.name)
+                valid_file = entry is not None and entry.is_file() and len(item.hash) != 0 
             
             if (self.strict_level >= 2):
-                if (valid_file):
-                    with open(asset_path, "rb") as file:
+                if (valid_file and not is_verified_folder):
+                    with profiler.phase("hashing"), open(asset_path, "rb") as file:
                         digest = sha1(file.read())
                         valid_file = digest.hexdigest() == item.hash
             
             if (valid_file): continue
             
+            # Unlisted items have no hash and are always downloaded
+            if (len(item.hash) != 0):
+                has_invalid_files = True
+            
             if (i >= self.worker_max_items):
                 i = 0
                 worker_chunks.append(temp_chunk)
@@ -248,6 +553,9 @@ class Downloader:
         # Append last small chunk
         if (len(temp_chunk.items) != 0):
             worker_chunks.append(temp_chunk)
+        
+        if (folder_state is not None and not has_invalid_files):
+            self.verified_state[basepath] = folder_state
                 
 
         for worker_chunk in worker_chunks:
@@ -260,7 +568,8 @@ class Downloader:
             if isinstance(item, Item):
                 continue
 
-            self.download(item, posixpath.join(basepath, item.name))
+            entry = entries.get(item.name)
+            self.download(item, posixpath.join(basepath, item.name), entry is not None and entry.is_dir())
             
     @DownloaderDecorator
     def download_folder(self, folder: ItemChain)  -> None:
@@ -273,20 +582,63 @@ class Downloader:
         """
 
         print("Downloading...")
-        self.download(folder)
-        self.wait_for_workers()
+        with profiler.phase("download"):
+            self.download(folder)
+            self.wait_for_workers()
         print("Downloading is finished")
     
     @DownloaderDecorator
-    def download_fingerprint(self, fingerprint: dict) -> None:
+    def download_fingerprint(self, fingerprint: dict, path_filter = None) -> None:
         """
         The function downloads a folder and its contents based on a given fingerprint.
         
         :param fingerprint: The `fingerprint` parameter is a dictionary that represents fingerprint data.
         :type fingerprint: dict
+        :param path_filter: Optional `PathFilter`, only files that pass it are downloaded
+        :type path_filter: PathFilter or None
         """
     
         root = ItemChain.from_fingerprint(fingerprint)
+        self.known_chain = root
+        self.stray_files = []
+        
+        if path_filter is not None:
+            root = path_filter.apply(root)
+        
         Downloader.add_unlisted_items(root)
+        
+        if self.strict_level >= 2 and self.use_repair_state:
+            self.load_repair_state()
+        
         self.download_folder(root)
         
+        if self.strict_level >= 2:
+            self.save_repair_state()
+        
+        if len(self.stray_files) != 0:
+            for path in self.stray_files:
+                print(f"[Main] File is not listed in fingerprint: {path}")
+            print(f"[Main] Found {len(self.stray_files)} files that are not listed in fingerprint")
+
+
+def make_downloader(backend: str, *args, max_requests: int = 256, max_connections: int = 64, **kwargs) -> Downloader:
+    """
+    The function `make_downloader` creates downloader with specified engine.
+    
+    :param backend: "threads" for thread workers or "asyncio" for asyncio engine
+    :type backend: str
+    :param max_requests: Maximum count of requests in flight, used only by asyncio engine
+    :type max_requests: int
+    :param max_connections: Maximum count of open connections, used only by asyncio engine
+    :type max_connections: int
+    :return: an instance of Downloader
+    """
+
+    if backend == "asyncio":
+        from .async_downloader import AsyncDownloader
+        return AsyncDownloader(*args, max_requests=max_requests, max_connections=max_connections, **kwargs)
+    
+    if backend != "threads":
+        raise Exception(f"Unknown download backend \"{backend}\"")
+    
+    return Downloader(*args, **kwargs)
@@ -1,5 +1,8 @@
 from __future__ import annotations
 import os
+import posixpath
+from hashlib import sha1
+from .profiler import profiler
 
 
 ''' Representation of "File" or asset with hash and name '''
@@ -13,6 +16,28 @@ class ItemChain:
     def __init__(self, name: str, *args) -> None:
         self.name = name
         self.items: list[Item or ItemChain] = list(args)
+        
+        # Digest of names and hashes of all items in chain, None if it is not computed
+        self.digest: str or None = None
+    
+    def compute_digest(self) -> str:
+        """
+        The function `compute_digest` computes digests of chain and all of its subfolders. Chains
+        with equal digests have identical content, so they can be skipped without comparing items.
+        Digest must be computed again if items are changed.
+        
+        :return: digest of the chain
+        """
+        
+        digest = sha1()
+        for item in sorted(self.items, key=lambda item: item.name):
+            if isinstance(item, ItemChain):
+                digest.update(f"d{item.name}\0{item.compute_digest()}\n".encode("utf8"))
+            else:
+                digest.update(f"f{item.name}\0{item.hash}\n".encode("utf8"))
+        
+        self.digest = digest.hexdigest()
+        return self.digest
     
     def get(self, name: str) -> Item or ItemChain or None:
         """
@@ -69,34 +94,58 @@ class ItemChain:
 
         return result_item
 
+    def walk(self, basepath: str = ""):
+        """
+        The function `walk` iterates over all files in chain and its subfolders.
+        
+        :param basepath: Path of the chain that is prepended to paths of files
+        :type basepath: str
+        :return: generator of tuples with path of file and the file itself
+        """
+        for item in self.items:
+            item_path = posixpath.join(basepath, item.name)
+
+            if isinstance(item, ItemChain):
+                yield from item.walk(item_path)
+            else:
+                yield item_path, item
+
     @staticmethod
-    def from_fingerprint(data: dict):
+    def from_fingerprint(data: dict, path_filter = None):
         """
         The `from_fingerprint` function takes in a dictionary of file descriptors and creates a
         hierarchical structure of folders and files based on the file paths and hashes provided.
         
         :param data: The `data` parameter is a dictionary that contains information about asset files.
         :type data: dict
+        :param path_filter: Optional `PathFilter`, files that do not pass it are not added to the structure
+        :type path_filter: PathFilter or None
         :return: an instance of the ItemChain class, which represents a hierarchical structure of items
         (files and folders) based on the provided fingerprint data.
         """
         root = ItemChain("")
 
-        files: list[dict] = data["files"]
+        with profiler.phase("from_fingerprint"):
+            files: list[dict] = data["files"]
 
-        for descriptor in files:
-            name = str(descriptor["file"])
-            hash = str(descriptor["sha"])
+            for descriptor in files:
+                name = str(descriptor["file"])
+                hash = str(descriptor["sha"])
 
-            folder = root
+                if path_filter is not None and not path_filter.match(name):
+                    continue
 
-            basename = os.path.dirname(name)
-            if (basename):
-                folder_name_chain = os.path.normpath(basename).split(os.sep)
-            else:
-                folder_name_chain = []
+                folder = root
+
+                basename = os.path.dirname(name)
+                if (basename):
+                    folder_name_chain = os.path.normpath(basename).split(os.sep)
+                else:
+                    folder_name_chain = []
             
-            folder: ItemChain = root.get_chain(folder_name_chain, True)
-            folder.items.append(Item(os.path.basename(name), hash))
+                folder: ItemChain = root.get_chain(folder_name_chain, True)
+                folder.items.append(Item(os.path.basename(name), hash))
+
+            root.compute_digest()
 
         return root
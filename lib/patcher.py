@@ -0,0 +1,130 @@
+import os
+from shutil import copyfile as fcopy
+from shutil import move as fmove
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Lock
+
+
+def copy_file_range(source: str, destination: str) -> None:
+    """
+    The function `copy_file_range` copies file inside of kernel if it is supported,
+    otherwise `shutil.copyfile` is used, which also uses `sendfile` where available.
+    """
+
+    if not hasattr(os, "copy_file_range"):
+        fcopy(source, destination)
+        return
+
+    with open(source, "rb") as source_file, open(destination, "wb") as destination_file:
+        size = os.fstat(source_file.fileno()).st_size
+        try:
+            while size > 0:
+                copied = os.copy_file_range(source_file.fileno(), destination_file.fileno(), size)
+                if copied == 0: break
+                size -= copied
+            return
+        except OSError:
+            pass
+
+    fcopy(source, destination)
+
+
+def link_or_copy(source: str, destination: str) -> None:
+    """
+    The function `link_or_copy` makes hardlink of file and falls back to copying if hardlinks are not supported.
+    Files are always replaced by downloader instead of being rewritten, so hardlinks never share later changes.
+    """
+
+    try:
+        os.remove(destination)
+    except FileNotFoundError:
+        pass
+
+    try:
+        os.link(source, destination)
+    except OSError:
+        copy_file_range(source, destination)
+
+
+class PatchWriter:
+    def __init__(self, assets_path: str, max_workers: int or None = None) -> None:
+        self.assets_path = assets_path
+        self.executor = ThreadPoolExecutor(max_workers)
+        self.futures: list[Future] = []
+        self.lock = Lock()
+        self.created_folders: set[str] = set()
+
+        # Folder where downloaded files are copied to, None means files are not copied
+        self.target_path: str or None = None
+
+    def make_folder(self, path: str) -> None:
+        with self.lock:
+            if path in self.created_folders: return
+
+        # Folder is marked as created only after it exists, so other threads never copy into missing folder
+        os.makedirs(path, exist_ok=True)
+
+        with self.lock:
+            self.created_folders.add(path)
+
+    def run(self, function, *args) -> None:
+        with self.lock:
+            self.futures.append(self.executor.submit(function, *args))
+
+    def submit(self, base_filepath: str) -> None:
+        """
+        The function `submit` copies downloaded file to the current patch folder as soon as it is written.
+
+        :param base_filepath: Asset path relative to assets folder
+        :type base_filepath: str
+        """
+
+        target_path = self.target_path
+        if target_path is None: return
+
+        self.copy(os.path.join(self.assets_path, base_filepath), os.path.join(target_path, base_filepath))
+
+    def copy(self, source: str, destination: str) -> None:
+        def copy_task():
+            self.make_folder(os.path.dirname(destination))
+            try:
+                link_or_copy(source, destination)
+            except FileNotFoundError:
+                print(f"Failed to copy file: {os.path.normpath(source)} -> {os.path.normpath(destination)}")
+
+        self.run(copy_task)
+
+    def move(self, source: str, destination: str) -> None:
+        def move_task():
+            self.make_folder(os.path.dirname(destination))
+            try:
+                fmove(source, destination)
+            except FileNotFoundError:
+                print(f"Failed to move file: {os.path.normpath(source)} -> {os.path.normpath(destination)}")
+
+        self.run(move_task)
+
+    def remove(self, path: str) -> None:
+        def remove_task():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+        self.run(remove_task)
+
+    def close(self) -> None:
+        """
+        The function `close` waits for all queued operations and stops thread pool.
+        """
+
+        with self.lock:
+            futures, self.futures = self.futures, []
+
+        for future in futures:
+            try:
+                future.result()
+            except Exception as exception:
+                print(f"[Patcher] {exception}")
+
+        self.executor.shutdown()
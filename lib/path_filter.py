@@ -0,0 +1,72 @@
+import posixpath
+from fnmatch import fnmatchcase
+from .item_chain import ItemChain
+
+
+class PathFilter:
+    def __init__(self, include: list[str] or None = None, exclude: list[str] or None = None) -> None:
+        self.include: list[str] = list(include or [])
+        self.exclude: list[str] = list(exclude or [])
+
+    @property
+    def is_empty(self) -> bool:
+        return len(self.include) == 0 and len(self.exclude) == 0
+
+    @staticmethod
+    def match_pattern(path: str, pattern: str) -> bool:
+        """
+        The function `match_pattern` checks if path matches glob pattern. Pattern also matches all files
+        inside of folder with the same name, so "sc/" or "sc" matches "sc/ui.sc".
+
+        :param path: Asset path with "/" as separator
+        :type path: str
+        :param pattern: Glob pattern
+        :type pattern: str
+        :return: True if path matches pattern
+        """
+
+        folder_pattern = pattern.rstrip("/")
+        if not folder_pattern: return True
+
+        return fnmatchcase(path, folder_pattern) or fnmatchcase(path, f"{folder_pattern}/*")
+
+    def match(self, path: str) -> bool:
+        """
+        The function `match` checks if asset path passes include and exclude filters.
+
+        :param path: Asset path with "/" as separator
+        :type path: str
+        :return: True if file must be processed
+        """
+
+        if self.include and not any(PathFilter.match_pattern(path, pattern) for pattern in self.include):
+            return False
+
+        return not any(PathFilter.match_pattern(path, pattern) for pattern in self.exclude)
+
+    def apply(self, chain: ItemChain, basepath: str = "") -> ItemChain:
+        """
+        The function `apply` returns a copy of chain that contains only files which pass filters.
+        Folders that become empty are removed.
+
+        :param chain: Folder to filter
+        :type chain: ItemChain
+        :param basepath: Path of the folder relative to assets root
+        :type basepath: str
+        :return: filtered copy of chain
+        """
+
+        if self.is_empty: return chain
+
+        result = ItemChain(chain.name)
+        for item in chain.items:
+            item_path = posixpath.join(basepath, item.name)
+
+            if isinstance(item, ItemChain):
+                folder = self.apply(item, item_path)
+                if len(folder.items) != 0:
+                    result.items.append(folder)
+            elif self.match(item_path):
+                result.items.append(item)
+
+        return result
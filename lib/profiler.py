@@ -0,0 +1,148 @@
+import io
+import time
+import threading
+from contextlib import contextmanager
+
+
+class PhaseStats:
+    def __init__(self) -> None:
+        self.calls = 0
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+        self.peak_memory: int or None = None
+
+
+class Profiler:
+    def __init__(self) -> None:
+        self.enabled = False
+        self.use_cprofile = False
+        self.use_tracemalloc = False
+
+        self.phases: dict[str, PhaseStats] = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.cprofile = None
+        self.start_time = 0.0
+
+    def start(self, use_cprofile: bool = False, use_tracemalloc: bool = False) -> None:
+        """
+        The function `start` enables collecting of phase timings.
+
+        :param use_cprofile: Whether main thread must be profiled with cProfile
+        :type use_cprofile: bool
+        :param use_tracemalloc: Whether peak memory of phases must be traced with tracemalloc
+        :type use_tracemalloc: bool
+        """
+
+        self.enabled = True
+        self.use_cprofile = use_cprofile
+        self.use_tracemalloc = use_tracemalloc
+        self.phases = {}
+        self.start_time = time.perf_counter()
+
+        if use_tracemalloc:
+            import tracemalloc
+            tracemalloc.start()
+
+        if use_cprofile:
+            import cProfile
+            self.cprofile = cProfile.Profile()
+            self.cprofile.enable()
+
+    def stop(self) -> None:
+        if not self.enabled: return
+
+        if self.cprofile is not None:
+            self.cprofile.disable()
+
+        if self.use_tracemalloc:
+            import tracemalloc
+            tracemalloc.stop()
+
+        self.enabled = False
+
+    @contextmanager
+    def phase(self, name: str):
+        """
+        The function `phase` measures wall time, CPU time and peak memory of code inside of `with` block.
+        Phases with the same name are summed up, phases can be nested and used from worker threads.
+        In worker threads CPU time of the thread itself is measured, in main thread CPU time of the whole process.
+
+        :param name: Name of phase in report
+        :type name: str
+        """
+
+        if not self.enabled:
+            yield
+            return
+
+        is_main_thread = threading.current_thread() is threading.main_thread()
+        cpu_clock = time.process_time if is_main_thread else time.thread_time
+        trace_memory = self.use_tracemalloc and is_main_thread
+
+        # Stack of peak memory of nested phases in main thread
+        stack: list[int] = self.local.__dict__.setdefault("stack", [])
+        if trace_memory:
+            import tracemalloc
+            if stack:
+                stack[-1] = max(stack[-1], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            stack.append(0)
+
+        wall_start = time.perf_counter()
+        cpu_start = cpu_clock()
+        try:
+            yield
+        finally:
+            wall_time = time.perf_counter() - wall_start
+            cpu_time = cpu_clock() - cpu_start
+
+            peak_memory = None
+            if trace_memory:
+                peak_memory = max(stack.pop(), tracemalloc.get_traced_memory()[1])
+                if stack:
+                    stack[-1] = max(stack[-1], peak_memory)
+
+            with self.lock:
+                stats = self.phases.setdefault(name, PhaseStats())
+                stats.calls += 1
+                stats.wall_time += wall_time
+                stats.cpu_time += cpu_time
+                if peak_memory is not None:
+                    stats.peak_memory = max(stats.peak_memory or 0, peak_memory)
+
+    def make_report(self) -> str:
+        """
+        The function `make_report` formats collected timings as text table.
+        :return: report text
+        """
+
+        lines = [
+            f"Total wall time: {time.perf_counter() - self.start_time:.3f} s",
+            "",
+            f"{'Phase':<24}{'Calls':>8}{'Wall, s':>12}{'CPU, s':>12}{'Peak memory, MB':>18}",
+        ]
+
+        for name, stats in self.phases.items():
+            peak_memory = f"{stats.peak_memory / 1024 ** 2:.2f}" if stats.peak_memory is not None else "-"
+            lines.append(f"{name:<24}{stats.calls:>8}{stats.wall_time:>12.3f}{stats.cpu_time:>12.3f}{peak_memory:>18}")
+
+        lines.append("")
+        lines.append("Phases from worker threads are summed up across all threads and may exceed total time")
+
+        if self.cprofile is not None:
+            import pstats
+            stream = io.StringIO()
+            pstats.Stats(self.cprofile, stream=stream).sort_stats("cumulative").print_stats(40)
+            lines.append("")
+            lines.append(stream.getvalue())
+
+        return "\n".join(lines)
+
+    def write_report(self, filepath: str) -> None:
+        with open(filepath, "w", encoding="utf8") as file:
+            file.write(self.make_report())
+
+
+# Shared profiler, it does nothing until it is started
+profiler = Profiler()
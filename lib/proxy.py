@@ -0,0 +1,287 @@
+from __future__ import annotations
+import os
+import json
+import time
+import posixpath
+from shutil import copyfileobj
+from threading import Event, Lock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from .budget import ByteBudget
+from .downloader import DownloaderWorker
+
+# Catalog is needed only to find server of version
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from .catalog import VersionCatalog
+
+
+def join_inside(root: str, filepath: str) -> str or None:
+    """
+    The function `join_inside` joins path to root and resolves it, so links and ".." can not lead outside of root.
+
+    :param root: Folder that path must stay in
+    :type root: str
+    :param filepath: Path relative to root
+    :type filepath: str
+    :return: resolved path or None if it is outside of root
+    """
+
+    root = os.path.realpath(root)
+    path = os.path.realpath(os.path.join(root, filepath))
+
+    if os.path.commonpath([root, path]) != root: return None
+    return path
+
+
+class PendingFetch:
+    def __init__(self) -> None:
+        self.event = Event()
+        self.status_code = 200
+
+
+class AssetProxy:
+    def __init__(
+        self,
+        upstreams: dict[str, list[str]],
+        cache_path: str,
+        asset_roots: list[str],
+        refresh_interval: float = 10,
+        catalog: VersionCatalog or None = None,
+        max_inflight_bytes: int or None = None,
+    ) -> None:
+        # Asset servers of every game server, the first one is used for versions that are not in catalog
+        self.upstreams = upstreams
+        self.catalog = catalog
+        self.catalog_lock = Lock()
+
+        # Missed files are streamed to cache, bytes in flight of all concurrent misses are limited by budget
+        self.budget = ByteBudget(max_inflight_bytes)
+        self.cache_path = cache_path
+        self.asset_roots = asset_roots
+        self.refresh_interval = refresh_interval
+
+        self.local_versions: dict[str, str] = {}
+        self.local_versions_time = 0.0
+        self.local_versions_lock = Lock()
+
+        self.pending: dict[str, PendingFetch] = {}
+        self.pending_lock = Lock()
+
+        os.makedirs(cache_path, exist_ok=True)
+
+    def refresh_local_versions(self, force: bool = False) -> None:
+        """
+        The function `refresh_local_versions` finds all versions that are stored in local assets,
+        including versions retained by staged updates.
+
+        :param force: Whether local versions must be refreshed even if they were refreshed recently
+        :type force: bool
+        """
+
+        with self.local_versions_lock:
+            if not force and time.monotonic() - self.local_versions_time < self.refresh_interval:
+                return
+
+            local_versions: dict[str, str] = {}
+            for root in self.asset_roots:
+                candidates = [root]
+
+                versions_path = os.path.join(root, "versions")
+                if os.path.isdir(versions_path):
+                    candidates += [os.path.join(versions_path, name) for name in os.listdir(versions_path)]
+
+                for candidate in candidates:
+                    try:
+                        with open(os.path.join(candidate, "fingerprint.json"), "rb") as file:
+                            sha = json.load(file).get("sha")
+                    except (OSError, ValueError):
+                        continue
+
+                    if sha: local_versions[sha] = candidate
+
+            self.local_versions = local_versions
+            self.local_versions_time = time.monotonic()
+
+    def find_local_file(self, content_hash: str, filepath: str) -> str or None:
+        """
+        The function `find_local_file` returns path of the requested file in local assets or proxy cache.
+        """
+
+        self.refresh_local_versions()
+
+        version_path = self.local_versions.get(content_hash)
+        if version_path is not None:
+            asset_path = join_inside(version_path, filepath)
+            if asset_path is not None and os.path.isfile(asset_path): return asset_path
+
+        cache_path = join_inside(self.cache_path, posixpath.join(content_hash, filepath))
+        if cache_path is not None and os.path.isfile(cache_path): return cache_path
+
+        return None
+
+    def get_upstream_urls(self, content_hash: str) -> list[str]:
+        """
+        The function `get_upstream_urls` returns asset servers of game servers that have version in catalog.
+        Versions that are not in catalog are requested from asset servers of all game servers.
+        """
+
+        servers: list[str] = []
+        if self.catalog is not None:
+            with self.catalog_lock:
+                servers = [server for server in self.catalog.find_servers(content_hash) if server in self.upstreams]
+
+        urls: list[str] = []
+        for server in servers or self.upstreams:
+            urls += [url for url in self.upstreams[server] if url and url not in urls]
+
+        return urls
+
+    def fetch(self, content_hash: str, filepath: str) -> str or int:
+        """
+        The function `fetch` returns path of the requested file, downloading it from upstream if it is
+        not stored locally. Concurrent requests of the same missing file wait for a single download.
+
+        :param content_hash: Version hash
+        :type content_hash: str
+        :param filepath: Asset path with "/" as separator
+        :type filepath: str
+        :return: path of the local file or status code of the failed request
+        """
+
+        local_path = self.find_local_file(content_hash, filepath)
+        if local_path is not None: return local_path
+
+        key = f"{content_hash}/{filepath}"
+        with self.pending_lock:
+            pending = self.pending.get(key)
+            is_owner = pending is None
+            if is_owner:
+                pending = PendingFetch()
+                self.pending[key] = pending
+
+        if not is_owner:
+            pending.event.wait()
+            if pending.status_code != 200: return pending.status_code
+            return self.find_local_file(content_hash, filepath) or 404
+
+        try:
+            cache_path = join_inside(self.cache_path, posixpath.join(content_hash, filepath))
+            if cache_path is None:
+                pending.status_code = 400
+                return 400
+
+            upstream_urls = self.get_upstream_urls(content_hash)
+            if len(upstream_urls) == 0:
+                pending.status_code = 404
+                return 404
+
+            version_cache_path = os.path.join(self.cache_path, content_hash)
+            os.makedirs(os.path.dirname(os.path.join(version_cache_path, filepath)), exist_ok=True)
+
+            status_code = DownloaderWorker.stream_file(upstream_urls, content_hash, version_cache_path, filepath, self.budget)
+            if status_code != 200:
+                pending.status_code = status_code
+                return status_code
+
+            os.replace(f"{os.path.join(version_cache_path, filepath)}.part", cache_path)
+            return cache_path
+        except Exception:
+            pending.status_code = 502
+            raise
+        finally:
+            with self.pending_lock:
+                del self.pending[key]
+            pending.event.set()
+
+    def head(self, content_hash: str, filepath: str) -> tuple[int, int or None]:
+        """
+        The function `head` returns status and size of the requested file. Files that are not stored locally
+        are asked from upstream with HEAD request, so checking size never downloads file.
+
+        :return: status code and file size or None if it is unknown
+        """
+
+        local_path = self.find_local_file(content_hash, filepath)
+        if local_path is not None: return (200, os.path.getsize(local_path))
+
+        upstream_urls = self.get_upstream_urls(content_hash)
+        if len(upstream_urls) == 0: return (404, None)
+
+        return DownloaderWorker.head_file(upstream_urls, content_hash, filepath)
+
+    def make_handler(self) -> type:
+        proxy = self
+
+        class AssetProxyHandler(BaseHTTPRequestHandler):
+            def parse_path(self) -> tuple[str, str] or None:
+                path = self.path.split("?", 1)[0].lstrip("/")
+                content_hash, _, filepath = path.partition("/")
+
+                # Backslash is a separator on Windows, so it is never accepted in asset paths
+                if not content_hash or not filepath or "\\" in path or "\0" in path or ".." in path.split("/") or posixpath.isabs(filepath):
+                    self.send_error(400)
+                    return None
+
+                return content_hash, filepath
+
+            def send_file_headers(self, size: int or None) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", "application/octet-stream")
+                if size is not None:
+                    self.send_header("Content-Length", str(size))
+                self.end_headers()
+
+            def do_HEAD(self):
+                path = self.parse_path()
+                if path is None: return
+
+                try:
+                    status_code, size = proxy.head(*path)
+                except Exception as exception:
+                    self.log_message("Failed to check %s: %s", "/".join(path), exception)
+                    self.send_error(502)
+                    return
+
+                if status_code != 200:
+                    self.send_error(status_code)
+                    return
+
+                self.send_file_headers(size)
+
+            def do_GET(self):
+                path = self.parse_path()
+                if path is None: return
+
+                try:
+                    filepath = proxy.fetch(*path)
+                except Exception as exception:
+                    self.log_message("Failed to fetch %s: %s", "/".join(path), exception)
+                    self.send_error(502)
+                    return
+
+                if isinstance(filepath, int):
+                    self.send_error(filepath)
+                    return
+
+                self.send_file_headers(os.path.getsize(filepath))
+
+                with open(filepath, "rb") as file:
+                    copyfileobj(file, self.wfile)
+
+        return AssetProxyHandler
+
+    def serve(self, host: str, port: int) -> None:
+        """
+        The function `serve` runs HTTP server with the same "{content_hash}/{path}" layout as asset servers.
+        """
+
+        server = ThreadingHTTPServer((host, port), self.make_handler())
+        server.daemon_threads = True
+
+        print(f"[Proxy] Serving assets on http://{host or '0.0.0.0'}:{port}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
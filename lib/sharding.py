@@ -0,0 +1,215 @@
+import os
+import time
+import posixpath
+from hashlib import sha1
+from .item_chain import ItemChain
+
+# Seconds after which takeover guard of crashed node is removed
+TAKEOVER_TIMEOUT = 60
+
+
+class ShardPlan:
+    def __init__(self, index: int, count: int) -> None:
+        if count < 1 or not 0 <= index < count:
+            raise Exception(f"Invalid shard {index} of {count}")
+
+        self.index = index
+        self.count = count
+
+    def get_shard(self, path: str, hash: str) -> int:
+        """
+        The function `get_shard` returns index of shard which file belongs to. Files are split into equal
+        ranges by their content hash, path hash is used for files without hash.
+
+        :param path: Asset path with "/" as separator
+        :type path: str
+        :param hash: Hash of file content from fingerprint
+        :type hash: str
+        :return: shard index
+        """
+
+        key = hash if len(hash) >= 8 else sha1(path.encode("utf8")).hexdigest()
+        return (int(key[:8], 16) * self.count) >> 32
+
+    def apply(self, chain: ItemChain, basepath: str = "") -> ItemChain:
+        """
+        The function `apply` returns a copy of chain that contains only files of this shard.
+        """
+
+        result = ItemChain(chain.name)
+        for item in chain.items:
+            item_path = posixpath.join(basepath, item.name)
+
+            if isinstance(item, ItemChain):
+                folder = self.apply(item, item_path)
+                if len(folder.items) != 0:
+                    result.items.append(folder)
+            elif self.get_shard(item_path, item.hash) == self.index:
+                result.items.append(item)
+
+        return result
+
+
+class ShardCoordinator:
+    def __init__(self, assets_path: str, content_hash: str, plan: ShardPlan, lock_timeout: float = 3600) -> None:
+        self.plan = plan
+        self.lock_timeout = lock_timeout
+        self.markers_path = os.path.join(assets_path, ".shards", content_hash)
+        self.lock_path = os.path.join(self.markers_path, "finalize.lock")
+        self.takeover_path = os.path.join(self.markers_path, "finalize.takeover")
+
+        os.makedirs(self.markers_path, exist_ok=True)
+
+    def get_marker_path(self, index: int) -> str:
+        return os.path.join(self.markers_path, f"{index}-of-{self.plan.count}.done")
+
+    def mark_done(self) -> None:
+        """
+        The function `mark_done` creates marker file which means that shard of this node is downloaded.
+        """
+
+        marker_path = self.get_marker_path(self.plan.index)
+        temp_marker_path = f"{marker_path}.tmp"
+
+        with open(temp_marker_path, "w") as file:
+            file.write(str(os.getpid()))
+        os.replace(temp_marker_path, marker_path)
+
+    def missing_shards(self) -> list[int]:
+        return [index for index in range(self.plan.count) if not os.path.exists(self.get_marker_path(index))]
+
+    @staticmethod
+    def get_owner() -> str:
+        from socket import gethostname
+        return f"{gethostname()} {os.getpid()}"
+
+    @staticmethod
+    def read_lock(path: str) -> tuple[str, int, int] or None:
+        """
+        The function `read_lock` returns owner of lock file with its inode and modification time,
+        which identify this exact lock even after it is renamed.
+        """
+
+        try:
+            with open(path, "r") as file:
+                owner = file.read()
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+
+        return (owner, stat.st_ino, stat.st_mtime_ns)
+
+    def is_lock_stale(self, lock: tuple[str, int, int]) -> bool:
+        """
+        The function `is_lock_stale` checks if node that holds finalize lock is gone. Process is checked
+        only on the same host, locks of other hosts become stale after `lock_timeout` seconds.
+        """
+
+        owner, _, lock_time = lock
+        if time.time() - lock_time / 1e9 > self.lock_timeout: return True
+
+        host, _, pid = owner.partition(" ")
+        if pid.isdigit() and host == self.get_owner().partition(" ")[0] and os.name != "nt":
+            try:
+                os.kill(int(pid), 0)
+            except ProcessLookupError:
+                return True
+            except PermissionError:
+                pass
+
+        return False
+
+    def remove_stale_lock(self) -> bool:
+        """
+        The function `remove_stale_lock` removes finalize lock if its node is gone. Nodes take over locks
+        one by one through takeover guard file, and lock is checked again after it is renamed, so lock that
+        was released and created again by another node is never removed.
+        :return: True if lock was removed
+        """
+
+        try:
+            guard_descriptor = os.open(self.takeover_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            # Guard is held only for a moment, old guard is left by node that crashed during takeover
+            try:
+                if time.time() - os.stat(self.takeover_path).st_mtime > TAKEOVER_TIMEOUT:
+                    os.remove(self.takeover_path)
+            except FileNotFoundError:
+                pass
+            return False
+
+        try:
+            lock = self.read_lock(self.lock_path)
+            if lock is None: return True
+            if not self.is_lock_stale(lock): return False
+
+            stale_lock_path = f"{self.lock_path}.{os.getpid()}.stale"
+            try:
+                os.rename(self.lock_path, stale_lock_path)
+            except FileNotFoundError:
+                return True
+
+            is_same_lock = self.read_lock(stale_lock_path) == lock
+            if not is_same_lock:
+                try:
+                    os.link(stale_lock_path, self.lock_path)
+                except FileExistsError:
+                    pass
+
+            os.remove(stale_lock_path)
+            return is_same_lock
+        finally:
+            os.close(guard_descriptor)
+            os.remove(self.takeover_path)
+
+    def try_acquire_finalize(self) -> bool:
+        """
+        The function `try_acquire_finalize` checks if all shards are done and tries to become the node
+        that finalizes download. Only one node can acquire it. Lock of node that crashed is taken over.
+        :return: True if this node must finalize download
+        """
+
+        if len(self.missing_shards()) != 0: return False
+
+        for _ in range(2):
+            try:
+                descriptor = os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                if not self.remove_stale_lock(): return False
+                continue
+
+            os.write(descriptor, self.get_owner().encode())
+            os.close(descriptor)
+            return True
+
+        return False
+
+    def release_finalize(self) -> None:
+        """
+        The function `release_finalize` removes finalize lock, so finalization can be retried after a failure.
+        """
+
+        try:
+            os.remove(self.lock_path)
+        except FileNotFoundError:
+            pass
+
+    def cleanup(self) -> None:
+        """
+        The function `cleanup` removes all marker files after download is finalized.
+        """
+
+        for name in os.listdir(self.markers_path):
+            try:
+                os.remove(os.path.join(self.markers_path, name))
+            except FileNotFoundError:
+                pass
+
+        try:
+            os.rmdir(self.markers_path)
+        except OSError:
+            pass
+        try:
+            os.rmdir(os.path.dirname(self.markers_path))
+        except OSError:
+            pass
@@ -0,0 +1,180 @@
+import os
+import json
+import posixpath
+from shutil import copyfile as fcopy
+from shutil import rmtree
+from .item_chain import ItemChain, Item
+
+
+class VersionStage:
+    def __init__(self, root_path: str, keep_versions: int = 2) -> None:
+        self.root_path = root_path
+        self.keep_versions = keep_versions
+
+        self.current_path = os.path.join(root_path, "current")
+        self.versions_path = os.path.join(root_path, "versions")
+        self.history_path = os.path.join(self.versions_path, "history")
+
+    def version_path(self, sha: str) -> str:
+        return os.path.join(self.versions_path, sha)
+
+    def current_version(self) -> str or None:
+        """
+        The function `current_version` returns hash of the version that `current` link points to.
+        :return: version hash or None if there is no active version yet
+        """
+
+        try:
+            return os.path.basename(os.path.normpath(os.readlink(self.current_path)))
+        except OSError:
+            return None
+
+    def read_history(self) -> list[str]:
+        if not os.path.exists(self.history_path):
+            return []
+
+        with open(self.history_path, "r") as file:
+            return [line.strip() for line in file if line.strip()]
+
+    def write_history(self, history: list[str]) -> None:
+        os.makedirs(self.versions_path, exist_ok=True)
+        with open(self.history_path, "w") as file:
+            file.write("\n".join(history))
+
+    def migrate(self) -> None:
+        """
+        The function `migrate` moves assets that were downloaded without staged mode into their own version
+        folder and makes it active. Does nothing if there is nothing to migrate.
+        """
+
+        if os.path.lexists(self.current_path): return
+
+        fingerprint_path = os.path.join(self.root_path, "fingerprint.json")
+        if not os.path.exists(fingerprint_path): return
+
+        with open(fingerprint_path, "rb") as file:
+            sha = json.load(file).get("sha")
+
+        if not sha: return
+
+        version_path = self.version_path(sha)
+        os.makedirs(version_path, exist_ok=True)
+
+        for name in os.listdir(self.root_path):
+            if name == "versions": continue
+            os.replace(os.path.join(self.root_path, name), os.path.join(version_path, name))
+
+        self.switch(sha)
+
+    def prepare(self, sha: str, current: ItemChain or None = None, latest: ItemChain or None = None) -> str:
+        """
+        The function `prepare` creates folder for a new version next to the active one and fills it
+        with hardlinks to all files that are the same in the active and new versions.
+
+        :param sha: Hash of the new version
+        :type sha: str
+        :param current: Chain of the active version
+        :type current: ItemChain or None
+        :param latest: Chain of the new version
+        :type latest: ItemChain or None
+        :return: path to the folder of the new version
+        """
+
+        version_path = self.version_path(sha)
+        os.makedirs(version_path, exist_ok=True)
+
+        current_version = self.current_version()
+        if current is None or latest is None or current_version is None or current_version == sha:
+            return version_path
+
+        current_path = self.version_path(current_version)
+
+        def link_chain(current: ItemChain, latest: ItemChain, basepath: str = ""):
+            current_items = {item.name: item for item in current.items}
+            destination_basepath = os.path.join(version_path, basepath)
+            os.makedirs(destination_basepath, exist_ok=True)
+
+            for item in latest.items:
+                current_item = current_items.get(item.name)
+                if current_item is None: continue
+
+                if isinstance(item, ItemChain):
+                    if isinstance(current_item, ItemChain):
+                        link_chain(current_item, item, posixpath.join(basepath, item.name))
+                    continue
+
+                if not isinstance(current_item, Item) or current_item.hash != item.hash:
+                    continue
+
+                source = os.path.join(current_path, basepath, item.name)
+                destination = os.path.join(destination_basepath, item.name)
+
+                try:
+                    os.link(source, destination)
+                except FileExistsError:
+                    pass
+                except FileNotFoundError:
+                    pass
+                except OSError:
+                    # Filesystem without hardlinks support
+                    fcopy(source, destination)
+
+        link_chain(current, latest)
+        return version_path
+
+    def switch(self, sha: str, remember: bool = True) -> None:
+        """
+        The function `switch` atomically points `current` link to the specified version.
+
+        :param sha: Hash of the version that must become active
+        :type sha: str
+        :param remember: Whether version should be added to versions history
+        :type remember: bool
+        """
+
+        temp_link_path = f"{self.current_path}.tmp"
+        if os.path.lexists(temp_link_path):
+            os.remove(temp_link_path)
+
+        os.symlink(posixpath.join("versions", sha), temp_link_path, target_is_directory=True)
+        os.replace(temp_link_path, self.current_path)
+
+        if remember:
+            history = [version for version in self.read_history() if version != sha]
+            history.append(sha)
+            self.write_history(history)
+
+    def rollback(self) -> str or None:
+        """
+        The function `rollback` makes the previous retained version active again.
+        :return: hash of the version that became active or None if there is no version to rollback to
+        """
+
+        history = self.read_history()
+        while len(history) > 1:
+            history.pop()
+            sha = history[-1]
+
+            if os.path.isdir(self.version_path(sha)):
+                self.switch(sha, False)
+                self.write_history(history)
+                return sha
+
+        return None
+
+    def prune(self) -> None:
+        """
+        The function `prune` deletes all versions except the active one and `keep_versions` previous ones.
+        """
+
+        history = self.read_history()
+        retained = set(history[-(self.keep_versions + 1):])
+        retained.add(self.current_version())
+
+        for name in os.listdir(self.versions_path):
+            path = self.version_path(name)
+            if name in retained or not os.path.isdir(path): continue
+
+            rmtree(path, ignore_errors=True)
+
+        self.write_history([sha for sha in history if sha in retained])
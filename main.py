@@ -1,25 +1,35 @@
+import json
 import posixpath
-from typing import Any
+from typing import Any, Callable
+from lib.archive import VersionArchive
+from lib.catalog import VersionCatalog
+from lib.cli import apply_args, ask_question_bool, ask_server
 from lib.client import Client, HelloServerResponse
-from lib.config import Config
-from lib.downloader import Downloader, DownloaderWorker
+from lib.config import Config, ServerDescriptor
+from lib.decompressor import DecompressionPipeline
+from lib.downloader import Downloader, DownloaderWorker, make_downloader
 from lib.item_chain import ItemChain, Item
+from lib.patcher import PatchWriter, link_or_copy
+from lib.profiler import profiler
+from lib.proxy import AssetProxy
+from lib.sharding import ShardCoordinator, ShardPlan
+from lib.staging import VersionStage
 import os
-from shutil import move as fmove
-from shutil import copyfile as fcopy
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 
 class ScDownloader:
-    def __init__(self) -> None:
-        self.config = Config("config.json")
+    def __init__(
+        self,
+        config: Config,
+        server: ServerDescriptor,
+        confirm: Callable[[str], bool] or None = None
+    ) -> None:
+        self.config = config
+        self.active_server = server
         
-        # Servers
-        print("Choose server to connect: ")
-
-        for i, descriptor in enumerate(self.config.servers):
-            print(f'{i}. "{descriptor.short_name}": {descriptor.server_address}"')
-
-        server_index = int(input("\nServer index: "))
-        self.active_server = self.config.servers[server_index]
+        # Asks whether optional update should be downloaded, updates are declined if there is no way to ask
+        self.confirm = confirm
 
         self.assets_path = f"assets/{self.config.custom_hash or self.active_server.short_name}/"
         self.patches_path = f"patches/{self.active_server.short_name}"
@@ -28,44 +38,50 @@ class ScDownloader:
         if (self.config.make_patches):
             os.makedirs(self.patches_path, exist_ok=True)
         
-        # Downloading by hash stuff
-        if (self.config.custom_hash):
-            self.config.asset_servers_override = self.config.asset_servers_override or self.get_latest_asset_servers()
+        # Staged updates stuff
+        self.stage: VersionStage or None = None
+        if (self.config.staged_updates and not self.config.custom_hash):
+            self.stage = VersionStage(self.assets_path, self.config.keep_versions)
+            self.stage.migrate()
+            self.assets_path = os.path.join(self.stage.current_path, "")
+        
+        self.client = self.make_client(self.assets_path)
 
-            hash_fingerprint = DownloaderWorker.download_file(
-                self.config.asset_servers_override,
-                self.config.custom_hash,
-                "fingerprint.json"
+        self.catalog = VersionCatalog(self.config.catalog_path)
+        self.catalog.add_fingerprint(self.active_server.short_name, self.client.fingerprint)
+        
+        # Archive of old versions content, shared by all versions of the server
+        self.archive: VersionArchive or None = None
+        if (self.config.archive_versions):
+            self.archive = VersionArchive(
+                os.path.join(self.config.archive_path, self.active_server.short_name),
+                self.config.archive_level,
+                self.config.max_workers,
             )
-            
-            if (isinstance(hash_fingerprint, int)):
-                raise Exception(f"Failed to get fingerprint.json by hash {self.config.custom_hash}. Request failed with code {hash_fingerprint}")
-            
-            os.makedirs(self.assets_path, exist_ok=True)
-            with open(os.path.join(self.assets_path, "fingerprint.json"), "wb") as file:
-                file.write(hash_fingerprint)
-            
-        self.client = Client(self.assets_path)
-        self.client.dump = self.config.save_dump
     
-    @staticmethod
-    def ask_question_bool(question: str) -> bool:
+    def download_hash_fingerprint(self) -> None:
         """
-        The function `ask_question_bool` prompts the user with a question and returns a boolean value
-        based on their response.
-        
-        :param question: A string representing the question that will be asked to the user
-        :type question: str
-        :return: The function `ask_question_bool` returns a boolean value.
+        The function `download_hash_fingerprint` downloads fingerprint of version specified by custom hash
+        and reloads client with it.
         """
-    
-        answer = str(input(f"{question} (yes/no): ")).lower()
+
+        self.config.asset_servers_override = self.config.asset_servers_override or self.get_latest_asset_servers()
         
-        if answer.startswith("y"): return True
-        if answer.startswith("n"): return False
+        hash_fingerprint = DownloaderWorker.download_file(
+            self.config.asset_servers_override,
+            self.config.custom_hash,
+            "fingerprint.json"
+        )
+        
+        if (isinstance(hash_fingerprint, int)):
+            raise Exception(f"Failed to get fingerprint.json by hash {self.config.custom_hash}. Request failed with code {hash_fingerprint}")
+        
+        os.makedirs(self.assets_path, exist_ok=True)
+        with open(os.path.join(self.assets_path, "fingerprint.json"), "wb") as file:
+            file.write(hash_fingerprint)
         
-        if answer.isdigit():
-            return int(answer) >= 1
+        self.client = self.make_client(self.assets_path)
+        self.catalog.add_fingerprint(self.active_server.short_name, self.client.fingerprint)
     
     @staticmethod
     def make_patch_chain(current: ItemChain, latest: ItemChain) -> list[ItemChain, ItemChain, ItemChain]:
@@ -87,7 +103,7 @@ class ScDownloader:
         """
 
         def make_chain(current: ItemChain, new: ItemChain) -> list[ItemChain, ItemChain, ItemChain]:
-            current_items_names = [item.name for item in current.items]
+            current_items_indices = {item.name: i for i, item in enumerate(current.items)}
             
             new_files_result = ItemChain(current.name) 
             changed_files_result = ItemChain(current.name) 
@@ -97,11 +113,11 @@ class ScDownloader:
             new_files_result = ItemChain(current.name) 
             for new_item in new.items:
                 # New Files
-                if new_item.name not in current_items_names:
+                if new_item.name not in current_items_indices:
                         new_files_result.items.append(new_item)
                         continue
                 
-                current_item_index = current_items_names.index(new_item.name)
+                current_item_index = current_items_indices[new_item.name]
                 current_item = current.items[current_item_index]
                 deleted_files_indices[current_item_index] = False
                 
@@ -110,6 +126,10 @@ class ScDownloader:
                     if (new_item.hash != current_item.hash):
                         changed_files_result.items.append(new_item)
                 else:
+                    # Identical folders are skipped without descending into them
+                    if (new_item.digest is not None and new_item.digest == getattr(current_item, "digest", None)):
+                        continue
+                    
                     # Folder Processing
                     new_files_chain, changed_files_chain, deleted_files_chain = make_chain(current_item, new_item)
                     
@@ -130,6 +150,10 @@ class ScDownloader:
                     deleted_files_result.items.append(current_item)
             
             return [new_files_result, changed_files_result, deleted_files_result]
+        
+        if (latest.digest is not None and latest.digest == current.digest):
+            return [ItemChain(current.name), ItemChain(current.name), ItemChain(current.name)]
+        
         return make_chain(current, latest)
     
     def download_all(self):
@@ -139,25 +163,122 @@ class ScDownloader:
         
         asset_servers_urls = self.config.asset_servers_override or \
             [self.client.assets_url, self.client.assets_url_2, self.client.content_url]
+        
+        # In staged mode first download goes to its own version folder which is activated after downloading
+        output_path = self.client.assets_path
+        staged_hash: str or None = None
+        if (self.stage is not None and self.stage.current_version() is None):
+            staged_hash = self.client.content_hash
+            output_path = self.stage.prepare(staged_hash)
 
-        downloader = Downloader(
+        pipeline = self.make_pipeline(output_path)
+        downloader = make_downloader(
+            self.config.download_backend,
             asset_servers_urls,
             self.client.content_hash,
-            self.client.assets_path,
+            output_path,
             self.config.max_workers,
             self.config.worker_max_items,
             int(self.config.repair) + int(self.config.strict_repair),
+            [pipeline] if pipeline is not None else None,
+            max_requests=self.config.async_max_requests,
+            max_connections=self.config.async_max_connections,
+            max_inflight_bytes=self.config.max_inflight_bytes,
+        )
+        downloader.use_repair_state = self.config.repair_state
+        
+        try:
+            if (self.config.shard is not None):
+                if (not self.download_shard(downloader, output_path)): return
+            else:
+                downloader.download_fingerprint(self.client.fingerprint, self.config.path_filter)
+        finally:
+            if (pipeline is not None): pipeline.close()
+        
+        if (staged_hash):
+            self.stage.switch(staged_hash)
+    
+    def make_pipeline(self, output_path: str) -> DecompressionPipeline or None:
+        """
+        The function `make_pipeline` creates decompression stage for downloaded files if it is enabled in config.
+        
+        :param output_path: Folder where downloader writes files
+        :type output_path: str
+        :return: an instance of DecompressionPipeline or None
+        """
+
+        if (not self.config.decompress_assets): return None
+        
+        return DecompressionPipeline(
+            output_path,
+            os.path.join(self.config.decompressed_path, self.config.custom_hash or self.active_server.short_name),
+            self.config.decompress_workers,
         )
-        downloader.download_fingerprint(self.client.fingerprint)
+    
+    def download_shard(self, downloader: Downloader, output_path: str) -> bool:
+        """
+        The function `download_shard` downloads only files of the shard of this node. When all shards are
+        done, the node that finishes last verifies all files and downloads `fingerprint.json`.
+        
+        :param downloader: Downloader of the whole version
+        :type downloader: Downloader
+        :param output_path: Assets folder that is shared between all nodes
+        :type output_path: str
+        :return: True if download was finalized by this node
+        """
+
+        plan = ShardPlan(*self.config.shard)
+        coordinator = ShardCoordinator(output_path, self.client.content_hash, plan, self.config.shard_lock_timeout)
+        root = ItemChain.from_fingerprint(self.client.fingerprint, self.config.path_filter)
+        
+        print(f"Downloading shard {plan.index} of {plan.count}")
+        downloader.download_folder(plan.apply(root))
+        coordinator.mark_done()
+        
+        if (not coordinator.try_acquire_finalize()):
+            missing_shards = coordinator.missing_shards()
+            if (len(missing_shards) != 0):
+                print(f"Shard {plan.index} is done. Download will be finalized by the node that finishes last, waiting for shards: {missing_shards}")
+            else:
+                print(f"Shard {plan.index} is done. Download is finalized by another node")
+            return False
+        
+        print("All shards are done. Verifying files...")
+        try:
+            downloader.strict_level = max(downloader.strict_level, 1)
+            downloader.download_folder(root)
+            
+            # Fingerprint is downloaded only after all files are in place
+            unlisted_items = ItemChain("")
+            Downloader.add_unlisted_items(unlisted_items)
+            downloader.download_folder(unlisted_items)
+        except BaseException:
+            coordinator.release_finalize()
+            raise
+        
+        coordinator.cleanup()
+        return True
+    
+    def make_client(self, assets_path: str) -> Client:
+        """
+        The function `make_client` creates client with dump and timeout settings from config.
+        """
+        client = Client(assets_path)
+        client.dump = self.config.save_dump
+        client.connect_timeout = self.config.connect_timeout
+        client.read_timeout = self.config.read_timeout
+        
+        return client
     
     def get_latest_client(self) -> Client:
         """
         The function `get_latest_client` returns client with the latest data.
         :return: an instance of the Client class.
         """
-        client_latest = Client("")
+        client_latest = self.make_client("")
         client_latest.major = client_latest.build = client_latest.revision = 0
-        client_latest.connect(self.active_server.server_address)
+        with profiler.phase("hello"):
+            client_latest.connect(self.active_server.server_address)
         
         return client_latest
     
@@ -180,9 +301,22 @@ class ScDownloader:
         Client class representing the latest client version.
         """
         client_latest = self.get_latest_client()
-        is_different = False in [client_latest.content_version[i] <= self.client.content_version[i] for i in range(3)]
         # print(f"Current version is {client_latest.content_version}, Server Version is {self.client.content_version}")
-        return (is_different, client_latest)
+        return (self.is_newer(client_latest), client_latest)
+
+    async def check_update_async(self) -> tuple[bool, Client]:
+        """
+        The function `check_update_async` works the same way as `check_update`, but makes hello exchange
+        in event loop, so servers can be checked concurrently.
+        """
+        client_latest = self.make_client("")
+        client_latest.major = client_latest.build = client_latest.revision = 0
+        await client_latest.connect_async(self.active_server.server_address)
+        
+        return (self.is_newer(client_latest), client_latest)
+
+    def is_newer(self, client_latest: Client) -> bool:
+        return False in [client_latest.content_version[i] <= self.client.content_version[i] for i in range(3)]
 
     def make_update(self, latest_client: Client or None = None) -> None:
         """
@@ -200,30 +334,13 @@ class ScDownloader:
             latest_client = self.get_latest_client()
         
         print("Updating...")
-        downloader = Downloader(
-            [latest_client.assets_url, latest_client.assets_url_2, latest_client.content_url],
-            latest_client.content_hash,
-            self.client.assets_path,
-            self.config.max_workers,
-            self.config.worker_max_items,
-        )
+        latest_chain = ItemChain.from_fingerprint(latest_client.fingerprint, self.config.path_filter)
+        current_chain = ItemChain.from_fingerprint(self.client.fingerprint, self.config.path_filter)
         
-        latest_chain = ItemChain.from_fingerprint(latest_client.fingerprint)
-        current_chain = ItemChain.from_fingerprint(self.client.fingerprint)
-        
-        new_files, changed_files, deleted_files = ScDownloader.make_patch_chain(current_chain, latest_chain)
-        
-        if (len(new_files.items) == 0):
-            print("There are no new files here")
-        else:
-            print("New Files: ")
-            downloader.download_folder(new_files)
-            
-        print("Downloading changed files")
-        Downloader.add_unlisted_items(changed_files)
-        downloader.download_folder(changed_files)
-        
-        print("Deleting unnecessary files")
+        # In staged mode new version is built next to the active one, unchanged files are hardlinked
+        output_path = self.client.assets_path
+        if (self.stage is not None):
+            output_path = self.stage.prepare(latest_client.content_hash, current_chain, latest_chain)
         
         # Some prepares for patching
         old_version = ".".join([str(num) for num in self.client.content_version])
@@ -234,58 +351,339 @@ class ScDownloader:
         changed_patch_path = os.path.join(patch_path, "changed")
         new_patch_path = os.path.join(patch_path, "new")
         
-        def remove_files(folder: ItemChain, basepath: str = ""):
-            # Macro optimization to avoid calling makedirs for each file
-            destination_basepath: str or None = None
-            if (self.config.make_detailed_patches):
-                destination_basepath = os.path.join(deleted_patch_path, basepath)
-                os.makedirs(destination_basepath, exist_ok=True)
-
-            for item in folder.items:
-                if isinstance(item, ItemChain):
-                    remove_files(item, posixpath.join(basepath, item.name))
-                else:
-                    asset_path = os.path.join(self.client.assets_path, basepath, item.name)
+        # Patch files are copied as soon as they are downloaded, deleted files are processed in the same pool
+        patcher = PatchWriter(output_path, self.config.max_workers)
+        pipeline = self.make_pipeline(output_path)
+        pipelines = [stage for stage in (pipeline, patcher if self.config.make_patches else None) if stage is not None]
+        
+        downloader = make_downloader(
+            self.config.download_backend,
+            self.config.asset_servers_override or \
+                [latest_client.assets_url, latest_client.assets_url_2, latest_client.content_url],
+            latest_client.content_hash,
+            output_path,
+            self.config.max_workers,
+            self.config.worker_max_items,
+            pipelines=pipelines,
+            max_requests=self.config.async_max_requests,
+            max_connections=self.config.async_max_connections,
+            max_inflight_bytes=self.config.max_inflight_bytes,
+        )
+        
+        with profiler.phase("make_patch_chain"):
+            new_files, changed_files, deleted_files = ScDownloader.make_patch_chain(current_chain, latest_chain)
+        
+        # Old content of changed and deleted files is archived before it is overwritten
+        if (self.archive is not None):
+            self.archive_files(current_chain, [changed_files, deleted_files])
+        
+        def remove_files(folder: ItemChain):
+            for path, _ in folder.walk():
+                asset_path = os.path.join(self.client.assets_path, path)
+                
+                if (pipeline is not None):
+                    pipeline.remove(path)
+                
+                if (self.config.make_detailed_patches):
+                    asset_destination = os.path.join(deleted_patch_path, path)
                     
-                    if (self.config.make_detailed_patches):
-                        asset_destination = os.path.join(destination_basepath, item.name)
-                        
-                        try:
-                            fmove(asset_path, asset_destination)
-                        except FileNotFoundError:
-                            print(f"Failed to move file: {os.path.normpath(asset_path)} -> {os.path.normpath(asset_destination)}")
-                            
+                    # Previous version is retained in staged mode so file is copied
+                    if (self.stage is not None):
+                        patcher.copy(asset_path, asset_destination)
                     else:
-                        os.remove(asset_path)
+                        patcher.move(asset_path, asset_destination)
+                        
+                elif (self.stage is None):
+                    patcher.remove(asset_path)
+        
+        try:
+            patcher.target_path = new_patch_path if self.config.make_detailed_patches else patch_path           # New Files Copy
+            if (len(new_files.items) == 0):
+                print("There are no new files here")
+            else:
+                print("New Files: ")
+                downloader.download_folder(new_files)
+            
+            patcher.target_path = changed_patch_path if self.config.make_detailed_patches else patch_path       # Changed Files Copy
+            print("Downloading changed files")
+            Downloader.add_unlisted_items(changed_files)
+            downloader.download_folder(changed_files)
+            
+            print("Deleting unnecessary files")
+            remove_files(deleted_files)                                                                         # Deleted Files Move
+        finally:
+            with profiler.phase("patch materialization"):
+                patcher.close()
+            if (pipeline is not None): pipeline.close()
+        
+        self.catalog.add_fingerprint(self.active_server.short_name, latest_client.fingerprint)
+        self.catalog.set_asset_servers(
+            self.active_server.short_name,
+            [latest_client.assets_url, latest_client.assets_url_2, latest_client.content_url]
+        )
         
-        def move_files(folder: ItemChain, output_path: str, basepath: str = ""):
-            destination_basepath = os.path.join(output_path, basepath)
-            os.makedirs(destination_basepath, exist_ok=True)
+        if (self.stage is not None):
+            self.stage.switch(latest_client.content_hash)
+            self.stage.prune()
+            print(f"Switched assets to version {new_version}")
 
+    def archive_files(self, current_chain: ItemChain, chains: list[ItemChain]) -> None:
+        """
+        The function `archive_files` stores current content of files from chains in archive.
+        Chains may come from the new version, so hashes are taken from current chain.
+        
+        :param current_chain: Chain of the current version
+        :type current_chain: ItemChain
+        :param chains: Chains with paths of files to archive
+        :type chains: list[ItemChain]
+        """
+        
+        current_files = {path: item.hash for path, item in current_chain.walk()}
+        files = [
+            (current_files[path], os.path.join(self.client.assets_path, path))
+            for chain in chains
+            for path, _ in chain.walk()
+            if path in current_files
+        ]
+        
+        with profiler.phase("archiving"):
+            count, raw_size, size = self.archive.add_files(self.client.content_hash, files)
+        
+        if (count != 0):
+            print(f"[Archive] Archived {count} files, {raw_size / 1024 ** 2:.2f} MB -> {size / 1024 ** 2:.2f} MB")
+    
+    def get_local_files(self) -> dict[str, str]:
+        """
+        The function `get_local_files` returns paths of files in local assets by their content hashes.
+        Only files that exist on disk are returned, so partial mirrors and deleted files are not trusted.
+        """
+        
+        existing_files: set[str] = set()
+        
+        def scan(path: str, basepath: str = ""):
+            try:
+                entries = list(os.scandir(path))
+            except FileNotFoundError:
+                return
+            
+            for entry in entries:
+                entry_path = posixpath.join(basepath, entry.name)
+                if entry.is_dir():
+                    scan(entry.path, entry_path)
+                elif entry.is_file():
+                    existing_files.add(entry_path)
+        
+        scan(self.client.assets_path)
+        
+        local_files: dict[str, str] = {}
+        for descriptor in self.client.fingerprint.get("files") or []:
+            filepath = str(descriptor["file"])
+            if filepath in existing_files:
+                local_files.setdefault(str(descriptor["sha"]), filepath)
+        
+        return local_files
+    
+    def extract_version(self, reference: str) -> None:
+        """
+        The function `extract_version` writes files of stored version to extract path. Files are taken
+        from local assets if they have the same content, otherwise from archive. Path filter from config
+        allows to extract only some files.
+        
+        :param reference: Hash or version number of version
+        :type reference: str
+        """
+        
+        server_name = self.active_server.short_name
+        version = self.catalog.resolve_version(server_name, reference)
+        if version is None:
+            raise Exception(f"Version {reference} is not found in catalog for {server_name}")
+        
+        output_path = os.path.join(self.config.extract_path, server_name, version[2])
+        local_files = self.get_local_files()
+        archived_files: list[tuple[str, str]] = []
+        missing_files: list[str] = []
+        count = 0
+        
+        for path, hash in self.catalog.get_files(version[0]):
+            if (not self.config.path_filter.match(path)): continue
+            
+            count += 1
+            destination = os.path.join(output_path, path)
+            local_path = local_files.get(hash)
+            if local_path is not None:
+                os.makedirs(os.path.dirname(destination), exist_ok=True)
+                try:
+                    link_or_copy(os.path.join(self.client.assets_path, local_path), destination)
+                    continue
+                except FileNotFoundError:
+                    pass
+            
+            if self.archive is not None:
+                archived_files.append((hash, destination))
+            else:
+                missing_files.append(path)
+        
+        if len(archived_files) != 0:
+            with profiler.phase("extraction"):
+                missing_hashes = {hash for hash, _ in self.archive.extract_files(archived_files)}
+            
+            missing_files.extend(
+                os.path.relpath(destination, output_path) for hash, destination in archived_files if hash in missing_hashes
+            )
+        
+        for path in missing_files:
+            print(f"File is not available in local assets or archive: {path}")
+        
+        print(f"Extracted {count - len(missing_files)} of {count} files of version {version[2]} to {os.path.normpath(output_path)}")
+    
+    def make_catalog_patch(self, old_reference: str, new_reference: str) -> None:
+        """
+        The function `make_catalog_patch` makes patch between two versions stored in version catalog.
+        Diff is done by catalog and files are copied from local assets, so no network access is needed.
+        Files that are not present in local assets with the same content are reported and skipped.
+        
+        :param old_reference: Hash or version number of the old version
+        :type old_reference: str
+        :param new_reference: Hash or version number of the new version
+        :type new_reference: str
+        """
+
+        server_name = self.active_server.short_name
+        old_version = self.catalog.resolve_version(server_name, old_reference)
+        new_version = self.catalog.resolve_version(server_name, new_reference)
+        
+        for reference, version in ((old_reference, old_version), (new_reference, new_version)):
+            if version is None:
+                raise Exception(f"Version {reference} is not found in catalog for {server_name}")
+        
+        new_files, changed_files, deleted_files = [
+            self.config.path_filter.apply(chain) for chain in self.catalog.diff(old_version[0], new_version[0])
+        ]
+        
+        # Local asset store is addressed by content hash of current fingerprint files
+        local_files = self.get_local_files()
+        
+        patch_path = os.path.join(self.patches_path, f"{old_version[2]} {new_version[2]}")
+        missing_files: list[str] = []
+        
+        def copy_files(folder: ItemChain, output_path: str, basepath: str = ""):
             for item in folder.items:
                 if isinstance(item, ItemChain):
-                    move_files(item, output_path, posixpath.join(basepath, item.name))
-                else:
-                    asset_path = os.path.join(self.client.assets_path, basepath, item.name)
-                    asset_destination = os.path.join(destination_basepath, item.name)
-                    
+                    copy_files(item, output_path, posixpath.join(basepath, item.name))
+                    continue
+                
+                destination_basepath = os.path.join(output_path, basepath)
+                destination = os.path.join(destination_basepath, item.name)
+                
+                local_path = local_files.get(item.hash)
+                if local_path is not None:
+                    os.makedirs(destination_basepath, exist_ok=True)
                     try:
-                        fcopy(asset_path, asset_destination)
+                        link_or_copy(os.path.join(self.client.assets_path, local_path), destination)
+                        continue
                     except FileNotFoundError:
-                        print(f"Failed to copy file: {os.path.normpath(asset_path)} -> {os.path.normpath(asset_destination)}")
-                    
+                        pass
+                
+                # Content of older versions may be stored in archive
+                if (self.archive is None or not self.archive.extract(item.hash, destination)):
+                    missing_files.append(posixpath.join(basepath, item.name))
+        
+        if (self.config.make_detailed_patches):
+            copy_files(new_files, os.path.join(patch_path, "new"))
+            copy_files(changed_files, os.path.join(patch_path, "changed"))
+            copy_files(deleted_files, os.path.join(patch_path, "deleted"))
+        else:
+            copy_files(new_files, patch_path)
+            copy_files(changed_files, patch_path)
+        
+        for path in missing_files:
+            print(f"File is not available in local assets: {path}")
+        
+        print(f"Patch {old_version[2]} -> {new_version[2]} is saved to {os.path.normpath(patch_path)}")
+
+    def remote_diff(self, old_hash: str, new_hash: str) -> None:
+        """
+        The function `remote_diff` compares two versions using only their fingerprints from asset servers
+        and prints count and total size of new, changed and deleted files. Nothing is written to assets.
+        
+        :param old_hash: Hash of the old version
+        :type old_hash: str
+        :param new_hash: Hash of the new version
+        :type new_hash: str
+        """
+
+        asset_servers_urls = self.config.asset_servers_override or self.get_latest_asset_servers()
+        
+        chains: list[ItemChain] = []
+        for content_hash in (old_hash, new_hash):
+            data = DownloaderWorker.download_file(asset_servers_urls, content_hash, "fingerprint.json")
+            
+            if (isinstance(data, int)):
+                raise Exception(f"Failed to get fingerprint.json by hash {content_hash}. Request failed with code {data}")
+            
+            fingerprint = json.loads(data)
+            self.catalog.add_fingerprint(self.active_server.short_name, fingerprint)
+            chains.append(ItemChain.from_fingerprint(fingerprint, self.config.path_filter))
+        
+        new_files, changed_files, deleted_files = ScDownloader.make_patch_chain(*chains)
+        
+        def get_sizes(chain: ItemChain, content_hash: str) -> list[int or None]:
+            paths = [path for path, _ in chain.walk()]
+            with ThreadPoolExecutor(self.config.max_workers) as executor:
+                return list(executor.map(
+                    lambda path: DownloaderWorker.get_file_size(asset_servers_urls, content_hash, path),
+                    paths
+                ))
+        
+        print(f"Difference between {old_hash} and {new_hash}:")
+        for name, chain, content_hash in (
+            ("New", new_files, new_hash),
+            ("Changed", changed_files, new_hash),
+            ("Deleted", deleted_files, old_hash),
+        ):
+            sizes = get_sizes(chain, content_hash)
+            known_sizes = [size for size in sizes if size is not None]
+            
+            message = f"{name} files: {len(sizes)}, {sum(known_sizes)} bytes"
+            if (len(known_sizes) != len(sizes)):
+                message += f" (size of {len(sizes) - len(known_sizes)} files is unknown)"
+            print(message)
+
+    def serve(self) -> None:
+        """
+        The function `serve` exposes local assets of all configured servers over HTTP in the same layout
+        as asset servers. Files that are missing locally are downloaded only once and cached, from asset
+        servers of the game server that the version belongs to according to version catalog.
+        """
+
+        # Active server goes first, so versions that are not in catalog are asked from it first
+        upstreams = {self.active_server.short_name: self.config.asset_servers_override or self.get_latest_asset_servers()}
+        for server in self.config.servers:
+            if server.short_name not in upstreams:
+                upstreams[server.short_name] = self.catalog.get_asset_servers(server.short_name)
         
-        remove_files(deleted_files)                                                                         # Deleted Files Move
-        if (not self.config.make_patches): return
+        asset_roots = [f"assets/{server.short_name}" for server in self.config.servers]
         
-        move_files(new_files, new_patch_path if self.config.make_detailed_patches else patch_path)          # New Files Copy
-        move_files(changed_files, changed_patch_path if self.config.make_detailed_patches else patch_path)  # Changed Files Copy
+        proxy = AssetProxy(
+            upstreams,
+            self.config.proxy_cache_path,
+            asset_roots,
+            catalog=self.catalog,
+            max_inflight_bytes=self.config.max_inflight_bytes,
+        )
+        proxy.serve(self.config.serve_host, self.config.serve_port)
 
     def make_connect(self) -> bool:
-        status = self.client.connect(self.active_server.server_address)
+        with profiler.phase("hello"):
+            status = self.client.connect(self.active_server.server_address)
             
         if status == HelloServerResponse.Success:
             print(f"Successfully connected to {self.active_server.short_name}")
+            self.catalog.add_fingerprint(self.active_server.short_name, self.client.fingerprint)
+            self.catalog.set_asset_servers(
+                self.active_server.short_name,
+                [self.client.assets_url, self.client.assets_url_2, self.client.content_url]
+            )
             return True
         elif status == HelloServerResponse.NeedUpdate:
             print(
@@ -297,14 +695,67 @@ class ScDownloader:
         return False
     
     def __call__(self, *args: Any, **kwds: Any) -> Any:
+        """
+        The function runs downloader, and if profiling is enabled, measures all phases of the run
+        and writes report to the profile path from config.
+        """
+        
+        if (self.config.profile_path is None):
+            return self.run()
+        
+        profiler.start(self.config.profile_cprofile, self.config.profile_memory)
+        try:
+            return self.run()
+        finally:
+            profiler.stop()
+            profiler.write_report(self.config.profile_path)
+            print(f"Profile report is saved to {self.config.profile_path}")
+    
+    def run(self) -> None:
         """
         The function checks if the client is connected to a server, updates the server if necessary,
         downloads assets if it's the first connection, and checks for updates and downloads them if
         requested.
         """
         
+        if (self.config.serve_port is not None):
+            self.serve()
+            return
+        
+        if (self.config.remote_diff):
+            self.remote_diff(*self.config.remote_diff)
+            return
+        
+        # Downloading by hash stuff
+        if (self.config.custom_hash):
+            self.download_hash_fingerprint()
+
         major, _, _ = self.client.content_version
 
+        if (self.config.rollback):
+            if (self.stage is None):
+                print("Rollback is available only with staged updates")
+                return
+            
+            version = self.stage.rollback()
+            if (version): print(f"Switched assets back to version {version}")
+            else: print("There is no retained version to rollback to")
+            return
+
+        # Version catalog handling
+        if (self.config.list_versions):
+            for sha, version in self.catalog.list_versions(self.active_server.short_name):
+                print(f"{version}: {sha}")
+            return
+        
+        if (self.config.diff_versions):
+            self.make_catalog_patch(*self.config.diff_versions)
+            return
+        
+        if (self.config.extract_version):
+            self.extract_version(self.config.extract_version)
+            return
+
         # Downloading from scratch
         if major == 0: 
             print("Detected first connection. This can take a little bit long time. Downloading all assets...")
@@ -329,22 +780,74 @@ class ScDownloader:
         is_update_available, client_latest = self.check_update()
         
         if is_update_available:
-            is_update_granted = self.config.auto_update
-            
-            old_version = ".".join([str(num) for num in self.client.content_version])
-            new_version = ".".join([str(num) for num in client_latest.content_version])
+            self.offer_update(client_latest)
+        else:
+            print("All files are ok and do not require updates")
+
+    def offer_update(self, client_latest: Client) -> None:
+        """
+        The function `offer_update` prints found update and downloads it if auto update is enabled
+        or user agrees to download it.
+        
+        :param client_latest: Client with fingerprint of the latest version
+        :type client_latest: Client
+        """
+        
+        is_update_granted = self.config.auto_update
+        
+        old_version = ".".join([str(num) for num in self.client.content_version])
+        new_version = ".".join([str(num) for num in client_latest.content_version])
+        
+        if (self.config.auto_update):
+            print(f"New update found {old_version} -> {new_version}")
+        elif (self.confirm is not None):
+            is_update_granted = self.confirm(f"New update found {old_version} -> {new_version}. Do you want download it?")
+        else:
+            print(f"New update found {old_version} -> {new_version}")
             
-            if (self.config.auto_update):
-                print(f"New update found {old_version} -> {new_version}")
-            else:
-                is_update_granted = ScDownloader.ask_question_bool(f"New update found {old_version} -> {new_version}. Do you want download it?")
-                
-            if (is_update_granted):
-                self.make_update(client_latest)
+        if (is_update_granted):
+            self.make_update(client_latest)
 
+
+def check_all_servers(config: Config, confirm: Callable[[str], bool] or None = None) -> None:
+    """
+    The function `check_all_servers` checks every server from config for updates concurrently, so it takes
+    about as long as the slowest server, and offers found updates one by one.
+    
+    :param config: Loaded config
+    :type config: Config
+    :param confirm: Asks whether optional update should be downloaded
+    :type confirm: Callable[[str], bool] or None
+    """
+    
+    downloaders = [ScDownloader(config, server, confirm) for server in config.servers]
+    
+    async def check_all():
+        return await asyncio.gather(
+            *[downloader.check_update_async() for downloader in downloaders],
+            return_exceptions=True
+        )
+    
+    for downloader, result in zip(downloaders, asyncio.run(check_all())):
+        name = downloader.active_server.short_name
+        
+        if isinstance(result, Exception):
+            print(f"[Main] Failed to check {name}: {type(result).__name__} {result}")
+            continue
+        
+        is_update_available, client_latest = result
+        if (not downloader.client.fingerprint):
+            print(f"[Main] {name} has no downloaded assets, run downloader for it to download them")
+        elif (is_update_available):
+            print(f"[Main] {name}:")
+            downloader.offer_update(client_latest)
         else:
-            print("All files are ok and do not require updates")
+            print(f"[Main] {name} is up to date")
 
 if __name__ == "__main__":
-    downloader = ScDownloader()
-    downloader()
\ No newline at end of file
+    config = apply_args(Config.load("config.json"))
+    if (config.check_all):
+        check_all_servers(config, ask_question_bool)
+    else:
+        downloader = ScDownloader(config, ask_server(config), ask_question_bool)
+        downloader()
\ No newline at end of file
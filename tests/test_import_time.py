@@ -0,0 +1,45 @@
+import os
+import subprocess
+import sys
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Core modules are imported by every run, heavy dependencies must be imported only when they are used
+IMPORT_STATEMENT = "import lib.config, lib.downloader, lib.client, lib.item_chain"
+IMPORT_TIME_BUDGET_MS = 100
+DEFERRED_MODULES = ["requests", "asyncio"]
+
+
+def measure_imports() -> tuple[int, list[str]]:
+    """
+    The function `measure_imports` imports core modules in a new interpreter with `-X importtime`.
+    :return: total import time of lib modules in microseconds and list of deferred modules that were imported
+    """
+
+    code = f"{IMPORT_STATEMENT}\nimport sys\nprint(','.join(name for name in {DEFERRED_MODULES!r} if name in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT_PATH, capture_output=True, text=True, check=True,
+    )
+
+    # Top level lines of report have no indentation before module name
+    total_time = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"): continue
+
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if name.startswith(" lib."):
+            total_time += int(cumulative)
+
+    imported_modules = [name for name in result.stdout.strip().split(",") if name]
+    return total_time, imported_modules
+
+
+def test_import_time():
+    total_time, _ = measure_imports()
+    assert total_time < IMPORT_TIME_BUDGET_MS * 1000, f"Core modules import took {total_time / 1000:.1f} ms"
+
+
+def test_heavy_modules_are_deferred():
+    _, imported_modules = measure_imports()
+    assert imported_modules == [], f"Modules must be imported lazily: {', '.join(imported_modules)}"